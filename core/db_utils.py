@@ -1,3 +1,5 @@
+import queue
+
 import tushare as ts
 import pymysql
 
@@ -34,4 +36,46 @@ class DatabaseUtils:
             charset=cls._charset
         )
         cursor = conn.cursor()
-        return conn, cursor 
\ No newline at end of file
+        return conn, cursor 
+
+    # 连接池：进程内复用空闲连接，避免每次请求都重新握手认证
+    _pool_size = 16  # 最多保留的空闲连接数
+    _pool = queue.LifoQueue(maxsize=_pool_size)
+
+    @classmethod
+    def get_pooled_connection(cls):
+        """
+        从连接池取出连接，池中无可用连接时新建
+        取出时ping检查连接，断开的连接自动重连或丢弃
+        :return: MySQL连接对象和游标，用完后调用release_connection归还
+        """
+        while True:
+            try:
+                conn = cls._pool.get_nowait()
+            except queue.Empty:
+                return cls.connect_to_mysql()
+            try:
+                conn.ping(reconnect=True)
+                return conn, conn.cursor()
+            except Exception:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    @classmethod
+    def release_connection(cls, conn):
+        """
+        归还连接到连接池
+        归还前回滚未提交的事务（同时结束只读查询的一致性快照），池满时直接关闭
+        """
+        try:
+            conn.rollback()
+            cls._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
@@ -0,0 +1,4 @@
+-- 为已有数据库补充批次查询索引（新建的表已在建表语句中包含该索引）
+-- 最近批次列表按 created_at 倒序取前N个批次，避免对全部批次排序
+
+ALTER TABLE `analysis_batches` ADD INDEX `idx_created_at_id` (`created_at`, `id`);
@@ -19,7 +19,7 @@ class AnalysisDatabase:
     """分析结果数据库操作类"""
     
     def __init__(self):
-        self.conn, self.cursor = DatabaseUtils.connect_to_mysql()
+        self.conn, self.cursor = DatabaseUtils.get_pooled_connection()
     
     def __enter__(self):
         return self
@@ -28,7 +28,7 @@ class AnalysisDatabase:
         if self.cursor:
             self.cursor.close()
         if self.conn:
-            self.conn.close()
+            DatabaseUtils.release_connection(self.conn)
     
     def create_tables(self) -> bool:
         """
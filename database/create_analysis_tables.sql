@@ -76,7 +76,8 @@ CREATE TABLE IF NOT EXISTS `analysis_batches` (
   
   -- 索引
   INDEX `idx_start_time` (`start_time`),
-  INDEX `idx_status` (`status`)
+  INDEX `idx_status` (`status`),
+  INDEX `idx_created_at_id` (`created_at`, `id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci COMMENT='分析任务批次表';
 
 -- 5. 批次结果关联表
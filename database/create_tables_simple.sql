@@ -61,7 +61,8 @@ CREATE TABLE IF NOT EXISTS `analysis_batches` (
   `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
   
   INDEX `idx_start_time` (`start_time`),
-  INDEX `idx_status` (`status`)
+  INDEX `idx_status` (`status`),
+  INDEX `idx_created_at_id` (`created_at`, `id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='分析任务批次表';
 
 -- 5. 批次结果关联表
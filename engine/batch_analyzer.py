@@ -28,6 +28,9 @@ class BatchAnalysisEngine:
             max_workers: 最大并发线程数
         """
         self.max_workers = max_workers
+        # 线程池在首次分析时创建并在多次分析间复用，长期运行的服务无需每批重新创建线程
+        self._executor = None
+        self._executor_lock = threading.Lock()
         self.analysis_stats = {
             'total_processed': 0,
             'successful': 0,
@@ -36,6 +39,21 @@ class BatchAnalysisEngine:
             'end_time': None
         }
     
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """获取分析线程池，不存在时创建"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='stock-analysis')
+            return self._executor
+    
+    def shutdown(self):
+        """关闭分析线程池"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+    
     def analyze_single_stock_multi_strategy(self, ts_code: str, strategy_names: List[str],
                                           days: int = 30) -> Dict:
         """
@@ -205,47 +223,47 @@ class BatchAnalysisEngine:
         successful_stocks = 0
         failed_stocks = 0
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 提交所有任务
-            future_to_stock = {
-                executor.submit(
-                    self.analyze_single_stock_multi_strategy, 
-                    ts_code, strategy_names, days
-                ): ts_code for ts_code in stock_list
-            }
+        executor = self._get_executor()
+        # 提交所有任务
+        future_to_stock = {
+            executor.submit(
+                self.analyze_single_stock_multi_strategy, 
+                ts_code, strategy_names, days
+            ): ts_code for ts_code in stock_list
+        }
+        
+        # 处理完成的任务
+        for future in as_completed(future_to_stock):
+            ts_code = future_to_stock[future]
             
-            # 处理完成的任务
-            for future in as_completed(future_to_stock):
-                ts_code = future_to_stock[future]
-                
-                try:
-                    result = future.result()
-                    results.append(result)
-                    
-                    if result['success']:
-                        successful_stocks += 1
-                        self.analysis_stats['successful'] += 1
-                    else:
-                        failed_stocks += 1
-                        self.analysis_stats['failed'] += 1
-                    
-                    self.analysis_stats['total_processed'] += 1
-                    
-                    # 进度回调
-                    if progress_callback:
-                        progress_callback(self.analysis_stats['total_processed'], total_stocks, ts_code)
-                    
-                    # 每处理10个股票打印进度
-                    if self.analysis_stats['total_processed'] % 10 == 0:
-                        progress = (self.analysis_stats['total_processed'] / total_stocks) * 100
-                        print(f"进度: {self.analysis_stats['total_processed']}/{total_stocks} "
-                              f"({progress:.1f}%) - 成功: {successful_stocks}, 失败: {failed_stocks}")
+            try:
+                result = future.result()
+                results.append(result)
                 
-                except Exception as e:
-                    print(f"处理股票 {ts_code} 时发生异常: {e}")
+                if result['success']:
+                    successful_stocks += 1
+                    self.analysis_stats['successful'] += 1
+                else:
                     failed_stocks += 1
                     self.analysis_stats['failed'] += 1
-                    self.analysis_stats['total_processed'] += 1
+                
+                self.analysis_stats['total_processed'] += 1
+                
+                # 进度回调
+                if progress_callback:
+                    progress_callback(self.analysis_stats['total_processed'], total_stocks, ts_code)
+                
+                # 每处理10个股票打印进度
+                if self.analysis_stats['total_processed'] % 10 == 0:
+                    progress = (self.analysis_stats['total_processed'] / total_stocks) * 100
+                    print(f"进度: {self.analysis_stats['total_processed']}/{total_stocks} "
+                          f"({progress:.1f}%) - 成功: {successful_stocks}, 失败: {failed_stocks}")
+            
+            except Exception as e:
+                print(f"处理股票 {ts_code} 时发生异常: {e}")
+                failed_stocks += 1
+                self.analysis_stats['failed'] += 1
+                self.analysis_stats['total_processed'] += 1
         
         self.analysis_stats['end_time'] = datetime.now()
         duration = (self.analysis_stats['end_time'] - self.analysis_stats['start_time']).total_seconds()
@@ -0,0 +1,28 @@
+"""
+Web服务生产部署配置（gunicorn + gevent）
+启动: gunicorn -c gunicorn.conf.py web_app:app
+
+gevent工作进程在加载应用前自动执行 monkey.patch_all()，
+PyMySQL为纯Python驱动，等待MySQL返回结果时会让出协程，多个请求的数据库I/O可以重叠进行。
+各工作进程的查询缓存相互独立，多进程部署时建议配置REDIS_URL共享缓存。
+网页提交的批量分析需配置REDIS_URL并安装rq交给rq worker执行，否则在请求中同步执行。
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5002')
+workers = int(os.environ.get('WEB_WORKERS', min(multiprocessing.cpu_count(), 4)))
+worker_class = 'gevent'
+
+# 工作进程继承该环境变量，web_app据此判断能否使用进程内的后台任务
+os.environ['WEB_WORKERS'] = str(workers)
+worker_connections = 1000
+
+# 生成批量分析或复杂图表的请求耗时较长
+timeout = 300
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
@@ -106,7 +106,8 @@ def analyze_single_stock(args):
                                 ts_code=args.stock_code,
                                 strategy_names=[args.strategy],
                                 days=args.days,
-                                save_path=args.chart_path
+                                save_path=args.chart_path,
+                                include_plotlyjs='cdn' if args.chart_cdn else True
                             )
                             
                             if args.show_chart and not args.chart_path:
@@ -175,7 +176,8 @@ def analyze_single_stock(args):
                                 ts_code=args.stock_code,
                                 strategy_names=successful_strategies,
                                 days=args.days,
-                                save_path=args.chart_path
+                                save_path=args.chart_path,
+                                include_plotlyjs='cdn' if args.chart_cdn else True
                             )
                             
                             if args.show_chart and not args.chart_path:
@@ -513,7 +515,8 @@ def main():
     analyze_parser.add_argument('--days', type=int, default=30, help='分析天数')
     analyze_parser.add_argument('--save-db', action='store_true', help='保存结果到数据库')
     analyze_parser.add_argument('--show-chart', action='store_true', help='显示图表')
-    analyze_parser.add_argument('--chart-path', help='保存图表路径 (HTML格式)')
+    analyze_parser.add_argument('--chart-path', help='保存图表路径 (HTML格式，以.gz结尾时gzip压缩)')
+    analyze_parser.add_argument('--chart-cdn', action='store_true', help='保存的图表从CDN加载plotly.js（文件更小，打开时需联网）')
     
     # 批量分析
     batch_parser = subparsers.add_parser('batch', help='批量股票分析')
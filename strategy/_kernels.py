@@ -0,0 +1,312 @@
+"""
+指标计算内核
+使用numba编译的逐K线循环，numba为可选依赖
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba不可用时退化为普通Python函数
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """numba.njit的空实现，兼容 @njit 与 @njit(...) 两种写法"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
+
+
+@njit(cache=True)
+def rolling_quantile(values, window, q):
+    """
+    滚动分位数（线性插值，与pandas rolling.quantile一致）
+    窗口内存在NaN时结果为NaN
+    """
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    pos = q * (window - 1)
+    lo = int(np.floor(pos))
+    hi = min(lo + 1, window - 1)
+    frac = pos - lo
+    buf = np.empty(window)
+
+    for i in range(window - 1, n):
+        has_nan = False
+        for j in range(window):
+            v = values[i - window + 1 + j]
+            if np.isnan(v):
+                has_nan = True
+                break
+            buf[j] = v
+        if has_nan:
+            continue
+        buf.sort()
+        out[i] = buf[lo] + (buf[hi] - buf[lo]) * frac
+
+    return out
+
+
+@njit(cache=True)
+def rolling_mean(values, window):
+    """
+    滚动均值，复现pandas rolling(window).mean()的带补偿滑动求和，结果与pandas逐位一致
+    窗口内有效值不足window个时结果为NaN
+    """
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    nobs = 0
+    neg_ct = 0
+    sum_x = 0.0
+    comp_add = 0.0
+    comp_remove = 0.0
+    same_ct = 0
+    prev_value = np.nan
+
+    for i in range(n):
+        # 移出窗口的旧值
+        if i >= window:
+            v = values[i - window]
+            if not np.isnan(v):
+                nobs -= 1
+                y = -v - comp_remove
+                t = sum_x + y
+                comp_remove = t - sum_x - y
+                sum_x = t
+                if np.signbit(v):
+                    neg_ct -= 1
+
+        # 加入新值
+        v = values[i]
+        if not np.isnan(v):
+            nobs += 1
+            y = v - comp_add
+            t = sum_x + y
+            comp_add = t - sum_x - y
+            sum_x = t
+            if np.signbit(v):
+                neg_ct += 1
+            if v == prev_value:
+                same_ct += 1
+            else:
+                same_ct = 1
+            prev_value = v
+
+        if nobs >= window and nobs > 0:
+            result = sum_x / nobs
+            if same_ct >= nobs:
+                result = prev_value
+            elif neg_ct == 0 and result < 0:
+                result = 0.0
+            elif neg_ct == nobs and result > 0:
+                result = 0.0
+            out[i] = result
+
+    return out
+
+
+@njit(cache=True)
+def rolling_std(values, window):
+    """
+    滚动样本标准差（ddof=1），每个窗口先求均值再求离差平方和
+    结果只取决于窗口内的值，实时模式对同一窗口计算可得到完全相同的结果
+    窗口未满或含NaN时结果为NaN
+    """
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    if window < 2:
+        return out
+
+    for i in range(window - 1, n):
+        total = 0.0
+        has_nan = False
+        for j in range(i - window + 1, i + 1):
+            v = values[j]
+            if np.isnan(v):
+                has_nan = True
+                break
+            total += v
+        if has_nan:
+            continue
+        mean = total / window
+        ssq = 0.0
+        for j in range(i - window + 1, i + 1):
+            d = values[j] - mean
+            ssq += d * d
+        out[i] = np.sqrt(ssq / (window - 1))
+
+    return out
+
+
+@njit(cache=True)
+def ema_recursive(values, alpha, init):
+    """
+    一阶递推平滑: prev = alpha * x + (1 - alpha) * prev
+    遇到NaN时沿用上一个值（KDJ的K/D计算）
+    """
+    n = values.shape[0]
+    out = np.empty(n)
+    prev = init
+
+    for i in range(n):
+        v = values[i]
+        if not np.isnan(v):
+            prev = alpha * v + (1.0 - alpha) * prev
+        out[i] = prev
+
+    return out
+
+
+@njit(cache=True)
+def rolling_min_max(low, high, window):
+    """
+    滚动最低价最小值与最高价最大值（单调队列，O(N)）
+    与pandas rolling(window).min()/max()一致：窗口未满或含NaN时结果为NaN
+    """
+    n = low.shape[0]
+    mins = np.full(n, np.nan)
+    maxs = np.full(n, np.nan)
+
+    # 环形缓冲区保存下标，队首为当前窗口的极值
+    min_q = np.empty(window, np.int64)
+    max_q = np.empty(window, np.int64)
+    min_head = 0
+    min_tail = 0
+    max_head = 0
+    max_tail = 0
+    last_nan_low = -window
+    last_nan_high = -window
+
+    for i in range(n):
+        # 移出窗口外的下标
+        if min_tail > min_head and min_q[min_head % window] <= i - window:
+            min_head += 1
+        if max_tail > max_head and max_q[max_head % window] <= i - window:
+            max_head += 1
+
+        lo = low[i]
+        if np.isnan(lo):
+            last_nan_low = i
+        else:
+            while min_tail > min_head and low[min_q[(min_tail - 1) % window]] >= lo:
+                min_tail -= 1
+            min_q[min_tail % window] = i
+            min_tail += 1
+
+        hi = high[i]
+        if np.isnan(hi):
+            last_nan_high = i
+        else:
+            while max_tail > max_head and high[max_q[(max_tail - 1) % window]] <= hi:
+                max_tail -= 1
+            max_q[max_tail % window] = i
+            max_tail += 1
+
+        if i < window - 1:
+            continue
+        if i - last_nan_low >= window:
+            mins[i] = low[min_q[min_head % window]]
+        if i - last_nan_high >= window:
+            maxs[i] = high[max_q[max_head % window]]
+
+    return mins, maxs
+
+
+@njit(cache=True)
+def kdj_recursive(rsv, init):
+    """
+    单次遍历同时递推K和D: K = 2/3 * K_prev + 1/3 * RSV, D = 2/3 * D_prev + 1/3 * K
+    RSV为NaN时K沿用上一个值
+    """
+    n = rsv.shape[0]
+    k_out = np.empty(n)
+    d_out = np.empty(n)
+    k = init
+    d = init
+
+    for i in range(n):
+        v = rsv[i]
+        if not np.isnan(v):
+            k = (2.0 / 3.0) * k + (1.0 / 3.0) * v
+        d = (2.0 / 3.0) * d + (1.0 / 3.0) * k
+        k_out[i] = k
+        d_out[i] = d
+
+    return k_out, d_out
+
+
+@njit(cache=True)
+def ewm_mean(values, span):
+    """
+    指数移动平均，逐步复现pandas ewm(span=span).mean()（adjust=True, ignore_na=False）
+    的递推顺序，结果与pandas逐位一致
+    """
+    n = values.shape[0]
+    out = np.empty(n)
+    if n == 0:
+        return out
+
+    com = (span - 1) / 2.0
+    alpha = 1.0 / (1.0 + com)
+    old_wt_factor = 1.0 - alpha
+
+    weighted = values[0]
+    out[0] = weighted
+    old_wt = 1.0
+
+    for i in range(1, n):
+        cur = values[i]
+        is_observation = not np.isnan(cur)
+        if not np.isnan(weighted):
+            old_wt *= old_wt_factor
+            if is_observation:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + cur) / (old_wt + 1.0)
+                old_wt += 1.0
+        elif is_observation:
+            weighted = cur
+        out[i] = weighted
+
+    return out
+
+
+# kdj_flags输出矩阵的行顺序
+KDJ_FLAG_COLUMNS = (
+    'k_above_d', 'k_below_d', 'kdj_golden_cross', 'kdj_death_cross',
+    'kdj_oversold', 'kdj_overbought', 'j_oversold', 'j_overbought',
+    'kdj_rising', 'kdj_falling',
+)
+
+
+@njit(cache=True)
+def kdj_flags(k, d, j, oversold, overbought):
+    """
+    单次遍历计算KDJ的全部布尔信号，行顺序见KDJ_FLAG_COLUMNS
+    NaN参与的比较均为False，首根K线的交叉与趋势为False
+    """
+    n = k.shape[0]
+    out = np.zeros((10, n), dtype=np.bool_)
+
+    for i in range(n):
+        ki = k[i]
+        di = d[i]
+        ji = j[i]
+        out[0, i] = ki > di
+        out[1, i] = ki < di
+        out[4, i] = ki < oversold and di < oversold
+        out[5, i] = ki > overbought and di > overbought
+        out[6, i] = ji < 0
+        out[7, i] = ji > 100
+        if i > 0:
+            kp = k[i - 1]
+            dp = d[i - 1]
+            out[2, i] = ki > di and kp <= dp
+            out[3, i] = ki < di and kp >= dp
+            out[8, i] = ki > kp and di > dp
+            out[9, i] = ki < kp and di < dp
+
+    return out
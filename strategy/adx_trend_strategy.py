@@ -9,8 +9,9 @@ import numpy as np
 from typing import Dict, Any
 from .base_strategy import BaseStrategy, StrategyFactory, Signal, AnalysisResult
 from .base_strategy import (
-    calculate_sma, calculate_ema, calculate_rsi, 
-    calculate_bollinger_bands, calculate_macd, calculate_atr, calculate_adx
+    calculate_sma, precompute_common, shared_ema,
+    calculate_bollinger_bands, calculate_macd, calculate_atr, calculate_adx,
+    current_timestamp, get_last_row
 )
 
 @StrategyFactory.register_strategy
@@ -98,13 +99,14 @@ class ADXTrendStrategy(BaseStrategy):
         dataframe['bearish_trend'] = (dataframe['di_minus'] > dataframe['di_plus']) & (dataframe['di_diff'] < -self.di_diff_threshold)
         
         # EMA趋势确认
-        dataframe['ema_fast'] = calculate_ema(dataframe['close'], self.ema_fast)
-        dataframe['ema_slow'] = calculate_ema(dataframe['close'], self.ema_slow)
+        dataframe['ema_fast'] = shared_ema(dataframe['close'], self.ema_fast)
+        dataframe['ema_slow'] = shared_ema(dataframe['close'], self.ema_slow)
         dataframe['ema_trend_up'] = dataframe['ema_fast'] > dataframe['ema_slow']
         dataframe['price_above_ema_fast'] = dataframe['close'] > dataframe['ema_fast']
         
         # RSI
-        dataframe['rsi'] = calculate_rsi(dataframe['close'], self.rsi_period)
+        common = precompute_common(dataframe, self.rsi_period)
+        dataframe['rsi'] = common['rsi']
         
         # MACD
         macd_line, signal_line, histogram = calculate_macd(
@@ -120,8 +122,8 @@ class ADXTrendStrategy(BaseStrategy):
         dataframe['atr_percent'] = dataframe['atr'] / dataframe['close']
         
         # 成交量指标
-        dataframe['volume_sma'] = dataframe['volume'].rolling(window=20).mean()
-        dataframe['volume_ratio'] = dataframe['volume'] / dataframe['volume_sma']
+        dataframe['volume_sma'] = common['volume_sma']
+        dataframe['volume_ratio'] = common['volume_ratio']
         
         # 布林带
         bb_upper, bb_middle, bb_lower = calculate_bollinger_bands(dataframe['close'], 20, 2.0)
@@ -149,17 +151,19 @@ class ADXTrendStrategy(BaseStrategy):
     def generate_signal(self, dataframe: pd.DataFrame) -> AnalysisResult:
         """生成交易信号"""
         
+        now_str = current_timestamp()
+        
         if len(dataframe) == 0:
             return AnalysisResult(
                 signal=Signal.HOLD,
                 confidence=0.0,
                 reasons=["数据不足"],
                 indicators={},
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
-        # 获取最新一行数据
-        last_row = dataframe.iloc[-1]
+        # 获取最新数据
+        last_row = get_last_row(dataframe)
         
         # 提取关键指标
         indicators = {
@@ -299,5 +303,5 @@ class ADXTrendStrategy(BaseStrategy):
             confidence=confidence,
             reasons=reasons,
             indicators=indicators,
-            timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+            timestamp=now_str
         )
\ No newline at end of file
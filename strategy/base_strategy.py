@@ -4,13 +4,27 @@
 """
 
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from enum import Enum
 from typing import Dict, Any, Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+import importlib
+import math
+import os
+import threading
 import pandas as pd
 import numpy as np
 import talib.abstract as ta
 from dataclasses import dataclass
 
+try:
+    import bottleneck as bn
+except ImportError:  # bottleneck为可选依赖，缺失时回退到pandas rolling
+    bn = None
+
+from ._kernels import NUMBA_AVAILABLE, ewm_mean, rolling_mean, rolling_min_max, rolling_quantile, rolling_std
+
 class Signal(Enum):
     """交易信号枚举"""
     BUY = "买入"
@@ -20,12 +34,187 @@ class Signal(Enum):
 @dataclass
 class AnalysisResult:
     """分析结果数据类"""
+    # 显式声明__slots__（兼容Python 3.10以下的dataclass），实例不再携带__dict__
+    __slots__ = ('signal', 'confidence', 'reasons', 'indicators', 'timestamp')
+    
     signal: Signal
     confidence: float  # 信号置信度 (0-1)
     reasons: list     # 信号原因列表
     indicators: dict  # 相关技术指标值
     timestamp: str    # 分析时间
 
+class RollingWindow:
+    """
+    固定长度滑动窗口
+    均值按pandas rolling.mean（calculate_sma的numba内核）的带补偿滑动求和逐步递推，
+    标准差对当前窗口调用calculate_rolling_std使用的同一内核，分位数按calculate_rolling_quantile的插值公式计算，
+    因此实时模式与批量计算的结果逐位一致（批量计算使用numba内核时）
+    窗口未满或含NaN时返回NaN
+    """
+    
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = np.full(window, np.nan)
+        self.count = 0   # 已写入的数据个数
+        self.pos = 0     # 下一个写入位置
+        self.mean = np.nan
+        
+        # 滑动求和状态，与 _kernels.rolling_mean 一致
+        self._nobs = 0
+        self._neg_ct = 0
+        self._sum = 0.0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._same_ct = 0
+        self._prev_value = np.nan
+    
+    @classmethod
+    def from_values(cls, values, window: int) -> 'RollingWindow':
+        """
+        用历史序列初始化
+        滑动求和的舍入结果取决于全部历史，需从序列开头逐个写入才能与批量计算一致
+        """
+        state = cls(window)
+        for value in np.asarray(values, dtype=np.float64):
+            state.push(value)
+        return state
+    
+    def push(self, value: float):
+        """追加一个新值，窗口已满时移出最旧值"""
+        value = float(value)
+        
+        # 移出窗口的旧值（窗口未满时缓冲区为NaN，不参与计算）
+        old = float(self.buffer[self.pos])
+        if not math.isnan(old):
+            self._nobs -= 1
+            y = -old - self._comp_remove
+            t = self._sum + y
+            self._comp_remove = t - self._sum - y
+            self._sum = t
+            if math.copysign(1.0, old) < 0:
+                self._neg_ct -= 1
+        
+        # 加入新值
+        if not math.isnan(value):
+            self._nobs += 1
+            y = value - self._comp_add
+            t = self._sum + y
+            self._comp_add = t - self._sum - y
+            self._sum = t
+            if math.copysign(1.0, value) < 0:
+                self._neg_ct += 1
+            if value == self._prev_value:
+                self._same_ct += 1
+            else:
+                self._same_ct = 1
+            self._prev_value = value
+        
+        self.buffer[self.pos] = value
+        self.pos = (self.pos + 1) % self.window
+        self.count += 1
+        
+        nobs = self._nobs
+        if nobs >= self.window and nobs > 0:
+            result = self._sum / nobs
+            if self._same_ct >= nobs:
+                result = self._prev_value
+            elif self._neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self._neg_ct == nobs and result > 0:
+                result = 0.0
+            self.mean = result
+        else:
+            self.mean = np.nan
+    
+    def std(self) -> float:
+        """样本标准差（ddof=1）"""
+        if self.count < self.window:
+            return np.nan
+        return float(rolling_std(self.values(), self.window)[-1])
+    
+    def quantile(self, q: float) -> float:
+        """分位数，与calculate_rolling_quantile相同的线性插值"""
+        values = self.values()
+        if self.count < self.window or np.isnan(values).any():
+            return np.nan
+        values.sort()
+        pos = q * (self.window - 1)
+        lo = int(np.floor(pos))
+        hi = min(lo + 1, self.window - 1)
+        return float(values[lo] + (values[hi] - values[lo]) * (pos - lo))
+    
+    def values(self) -> np.ndarray:
+        """按时间顺序返回窗口内的值"""
+        return np.roll(self.buffer, -self.pos)
+
+class EWMState:
+    """指数移动平均的O(1)递推状态，按calculate_ema的numba内核（与pandas ewm(span=period).mean()逐位一致）的顺序递推"""
+    
+    def __init__(self, period: int):
+        com = (period - 1) / 2.0
+        self.old_wt_factor = 1.0 - 1.0 / (1.0 + com)
+        self.weighted = np.nan
+        self.old_wt = 1.0
+    
+    @classmethod
+    def from_last(cls, last_value: float, count: int, period: int) -> 'EWMState':
+        """由批量计算得到的最后一个EMA值和数据个数恢复递推状态（序列不含NaN）"""
+        state = cls(period)
+        state.weighted = float(last_value)
+        for _ in range(count - 1):
+            state.old_wt = state.old_wt * state.old_wt_factor + 1.0
+        return state
+    
+    def push(self, value: float) -> float:
+        """追加一个新值并返回最新EMA"""
+        cur = float(value)
+        is_observation = not math.isnan(cur)
+        if not math.isnan(self.weighted):
+            self.old_wt *= self.old_wt_factor
+            if is_observation:
+                if self.weighted != cur:
+                    self.weighted = (self.old_wt * self.weighted + cur) / (self.old_wt + 1.0)
+                self.old_wt += 1.0
+        elif is_observation:
+            self.weighted = cur
+        return self.weighted
+
+class IncrementalState:
+    """
+    实时模式增量计算状态
+    按名称保存各指标的滑动窗口、EMA递推状态和上一根K线的指标值
+    """
+    
+    def __init__(self):
+        self.windows: Dict[str, RollingWindow] = {}
+        self.ewms: Dict[str, EWMState] = {}
+        self.last_values: Dict[str, float] = {}
+        self.last_row: Optional[Dict[str, Any]] = None
+    
+    def seed_rsi(self, close: pd.Series, period: int):
+        """由历史收盘价建立RSI的涨跌幅窗口（与calculate_rsi一致）"""
+        delta = close.diff()
+        self.windows['gain'] = RollingWindow.from_values(delta.where(delta > 0, 0), period)
+        self.windows['loss'] = RollingWindow.from_values(-delta.where(delta < 0, 0), period)
+    
+    def push_rsi(self, delta: float) -> float:
+        """追加一根K线的涨跌幅并返回最新RSI"""
+        # 与calculate_rsi一致：非下跌时跌幅记为-0.0
+        self.windows['gain'].push(delta if delta > 0 else 0.0)
+        self.windows['loss'].push(-(delta if delta < 0 else 0.0))
+        rs = np.float64(self.windows['gain'].mean) / np.float64(self.windows['loss'].mean)
+        return 100 - (100 / (1 + rs))
+    
+    def seed_volume(self, volume: pd.Series, period: int = 20):
+        """由历史成交量建立成交量均线窗口"""
+        self.windows['volume'] = RollingWindow.from_values(volume, period)
+    
+    def push_volume(self, volume: float) -> Tuple[float, float]:
+        """追加一根K线的成交量，返回 (volume_sma, volume_ratio)"""
+        self.windows['volume'].push(volume)
+        volume_sma = np.float64(self.windows['volume'].mean)
+        return volume_sma, np.float64(volume) / volume_sma
+
 class BaseStrategy(ABC):
     """
     统一的策略基类
@@ -36,6 +225,9 @@ class BaseStrategy(ABC):
         self.name = self.__class__.__name__
         self.timeframe = '15m'  # 默认15分钟
         self.startup_candle_count = 50  # 启动需要的K线数量
+        self._history = None  # 实时模式下的历史K线（默认全量重算实现使用）
+        self._state = None    # 实时模式下的增量计算状态
+        self.indicator_dtype = np.float64  # 指标列存储精度，可设为np.float32减半内存占用
         
     @abstractmethod
     def get_strategy_name(self) -> str:
@@ -108,6 +300,20 @@ class BaseStrategy(ABC):
         
         return dataframe
     
+    def downcast_indicators(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        按indicator_dtype转换指标列的存储精度
+        原始行情列保持float64，指标在float64下计算完成后再转换，避免递推误差累积
+        """
+        if self.indicator_dtype == np.float64:
+            return dataframe
+        
+        raw_columns = {'open', 'high', 'low', 'close', 'volume', 'amount'}
+        for col in dataframe.columns:
+            if col not in raw_columns and dataframe[col].dtype == np.float64:
+                dataframe[col] = dataframe[col].astype(self.indicator_dtype, copy=False)
+        return dataframe
+    
     def _clean_nan_values(self, indicators: Dict) -> Dict:
         """清理指标字典中的NaN值"""
         import math
@@ -141,7 +347,7 @@ class BaseStrategy(ABC):
                 confidence=0.0,
                 reasons=["数据验证失败"],
                 indicators={},
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=current_timestamp()
             )
         
         try:
@@ -154,16 +360,7 @@ class BaseStrategy(ABC):
             # 生成交易信号
             result = self.generate_signal(dataframe)
             
-            # 清理结果中的NaN值
-            if result.indicators:
-                result.indicators = self._clean_nan_values(result.indicators)
-            
-            # 检查confidence是否为NaN
-            import math
-            if math.isnan(result.confidence) or math.isinf(result.confidence):
-                result.confidence = 0.0
-            
-            return result
+            return self._finalize_result(result)
             
         except Exception as e:
             print(f"策略分析错误 [{self.name}]: {e}")
@@ -172,8 +369,69 @@ class BaseStrategy(ABC):
                 confidence=0.0,
                 reasons=[f"分析异常: {str(e)}"],
                 indicators={},
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=current_timestamp()
             )
+    
+    def _finalize_result(self, result: AnalysisResult) -> AnalysisResult:
+        """清理分析结果中的NaN值"""
+        # 清理结果中的NaN值
+        if result.indicators:
+            result.indicators = self._clean_nan_values(result.indicators)
+        
+        # 检查confidence是否为NaN
+        import math
+        if math.isnan(result.confidence) or math.isinf(result.confidence):
+            result.confidence = 0.0
+        
+        return result
+    
+    def warmup(self, dataframe: pd.DataFrame) -> AnalysisResult:
+        """
+        实时模式初始化
+        用历史K线建立状态，返回最新一根K线的分析结果
+        """
+        self._history = dataframe.copy()
+        return self.analyze(self._history.copy())
+    
+    def _analyze_tick_until_warm(self, row: Dict[str, Any]) -> AnalysisResult:
+        """增量状态建立前按默认方式全量计算，历史K线足够后建立增量状态"""
+        result = BaseStrategy.analyze_tick(self, row)
+        if len(self._history) >= self.startup_candle_count:
+            self.warmup(self._history)
+        return result
+    
+    def _parse_tick(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """将新K线的价格和成交量转为float，收盘价无效时返回None"""
+        new_row = dict(row)
+        for col in ['open', 'high', 'low', 'close', 'volume']:
+            new_row[col] = float(pd.to_numeric(new_row.get(col), errors='coerce'))
+        if np.isnan(new_row['close']):
+            return None
+        return new_row
+    
+    def _invalid_tick_result(self) -> AnalysisResult:
+        """新K线数据无效时的返回结果"""
+        return AnalysisResult(
+            signal=Signal.HOLD,
+            confidence=0.0,
+            reasons=["数据验证失败"],
+            indicators={},
+            timestamp=current_timestamp()
+        )
+    
+    def analyze_tick(self, row: Dict[str, Any]) -> AnalysisResult:
+        """
+        实时模式 - 追加一根新K线并返回分析结果
+        默认实现为追加后全量重算，支持增量计算的策略可重写此方法
+        Args:
+            row: 包含open/high/low/close/volume的新K线
+        """
+        new_row = pd.DataFrame([dict(row)])
+        if self._history is None:
+            self._history = new_row
+        else:
+            self._history = pd.concat([self._history, new_row], ignore_index=True)
+        return self.analyze(self._history.copy())
 
 class StrategyFactory:
     """策略工厂类"""
@@ -200,18 +458,245 @@ class StrategyFactory:
     def get_available_strategies(cls) -> list:
         """获取所有可用策略"""
         return list(cls._strategies.keys())
+    
+    @classmethod
+    def analyze_all(cls, frames: Dict[str, pd.DataFrame],
+                    strategy_names: Optional[list] = None,
+                    max_workers: Optional[int] = None,
+                    use_processes: bool = True) -> Dict[str, Dict[str, AnalysisResult]]:
+        """
+        多股票多策略并行分析
+        Args:
+            frames: {股票代码: OHLCV DataFrame}
+            strategy_names: 策略名称列表，默认使用全部已注册策略
+            max_workers: 最大并发数，默认CPU核数
+            use_processes: True使用进程池绕过GIL；False使用线程池，避免DataFrame跨进程序列化开销
+        Returns:
+            {股票代码: {策略名称: AnalysisResult}}
+        """
+        if strategy_names is None:
+            strategy_names = cls.get_available_strategies()
+        
+        # 按股票分组：同一股票的全部策略在同一个工作单元内执行，共享公共指标缓存，
+        # 且每个DataFrame只序列化一次
+        jobs = [(symbol, list(strategy_names), dataframe) for symbol, dataframe in frames.items()]
+        results = {symbol: {} for symbol in frames}
+        if not jobs or not strategy_names:
+            return results
+        
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with executor_class(max_workers=max_workers or os.cpu_count()) as executor:
+            for symbol, symbol_results in executor.map(_analyze_worker, jobs):
+                results[symbol] = symbol_results
+        
+        return results
+    
+    @classmethod
+    def run_all(cls, dataframe: pd.DataFrame,
+                strategy_names: Optional[list] = None) -> Dict[str, AnalysisResult]:
+        """
+        单只股票多策略分析
+        各策略依次在同一份行情上运行，RSI、成交量均线和收盘价EMA只计算一次
+        Returns:
+            {策略名称: AnalysisResult}
+        """
+        if strategy_names is None:
+            strategy_names = cls.get_available_strategies()
+        
+        return {
+            strategy_name: cls.create_strategy(strategy_name).analyze(dataframe.copy())
+            for strategy_name in strategy_names
+        }
+
+def _analyze_worker(job: Tuple[str, list, pd.DataFrame]) -> Tuple[str, Dict[str, AnalysisResult]]:
+    """analyze_all的工作函数，需定义在模块顶层以便进程池序列化"""
+    symbol, strategy_names, dataframe = job
+    if any(name not in StrategyFactory._strategies for name in strategy_names):
+        # spawn模式下子进程只导入了本模块，需导入策略包以完成注册
+        importlib.import_module(__name__.rpartition('.')[0])
+    return symbol, StrategyFactory.run_all(dataframe, strategy_names)
 
 # 辅助函数
+def current_timestamp() -> str:
+    """当前时间字符串，使用标准库datetime，避免pd.Timestamp的开销"""
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+def get_last_row(dataframe: pd.DataFrame, position: int = -1) -> Dict[str, Any]:
+    """
+    最新一行（或position指定的行）数据转为 {列名: 值} 字典
+    一次取出整行数组，之后的 .get 查找为普通字典操作，不再经过Series标签索引
+    """
+    return dict(zip(dataframe.columns, dataframe.iloc[position].to_numpy()))
+
+def append_columns(dataframe: pd.DataFrame, columns: Dict[str, Any]) -> pd.DataFrame:
+    """
+    一次性追加多个指标列
+    使用单次concat代替逐列赋值；已存在同名列时逐列覆盖，保持原有列位置
+    """
+    if any(col in dataframe.columns for col in columns):
+        for col, values in columns.items():
+            dataframe[col] = values
+        return dataframe
+    
+    values = {
+        col: data.to_numpy() if isinstance(data, pd.Series) else data
+        for col, data in columns.items()
+    }
+    return pd.concat([dataframe, pd.DataFrame(values, index=dataframe.index)], axis=1)
+
+def detect_crosses(fast, slow) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    同时检测上穿与下穿，返回 (上穿, 下穿)，首根为False
+    只计算一次差值 fast - slow，以其符号判断交叉
+    """
+    diff = np.asarray(fast, dtype=np.float64) - np.asarray(slow, dtype=np.float64)
+    above = np.zeros(len(diff), dtype=bool)
+    below = np.zeros(len(diff), dtype=bool)
+    above[1:] = (diff[1:] > 0) & (diff[:-1] <= 0)
+    below[1:] = (diff[1:] < 0) & (diff[:-1] >= 0)
+    return above, below
+
+def cross_above(fast, slow) -> np.ndarray:
+    """上穿检测: 当前 fast > slow 且前一根 fast <= slow，首根为False"""
+    return detect_crosses(fast, slow)[0]
+
+def cross_below(fast, slow) -> np.ndarray:
+    """下穿检测: 当前 fast < slow 且前一根 fast >= slow，首根为False"""
+    return detect_crosses(fast, slow)[1]
+
+def is_rising(data, lag: int = 1) -> np.ndarray:
+    """当前值大于lag根之前的值，前lag根为False（等价于 data > data.shift(lag)）"""
+    values = np.asarray(data, dtype=np.float64)
+    out = np.zeros(len(values), dtype=bool)
+    out[lag:] = values[lag:] > values[:-lag]
+    return out
+
+def is_falling(data, lag: int = 1) -> np.ndarray:
+    """当前值小于lag根之前的值，前lag根为False（等价于 data < data.shift(lag)）"""
+    values = np.asarray(data, dtype=np.float64)
+    out = np.zeros(len(values), dtype=bool)
+    out[lag:] = values[lag:] < values[:-lag]
+    return out
+
+# 公共指标缓存：多个策略分析同一行情时只计算一次RSI、成交量均线和收盘价EMA
+_COMMON_CACHE = OrderedDict()
+_COMMON_CACHE_SIZE = 64
+_COMMON_CACHE_LOCK = threading.Lock()
+
+def _content_key(values: np.ndarray) -> tuple:
+    """以数组长度和内容哈希作为缓存键"""
+    return (len(values), hash(values.tobytes()))
+
+def _cached_arrays(key: tuple, compute) -> Dict[str, np.ndarray]:
+    """按key读取公共指标缓存，未命中时调用compute()计算并写入，返回数组副本"""
+    with _COMMON_CACHE_LOCK:
+        arrays = _COMMON_CACHE.get(key)
+        if arrays is not None:
+            _COMMON_CACHE.move_to_end(key)
+    
+    if arrays is None:
+        arrays = compute()
+        with _COMMON_CACHE_LOCK:
+            _COMMON_CACHE[key] = arrays
+            while len(_COMMON_CACHE) > _COMMON_CACHE_SIZE:
+                _COMMON_CACHE.popitem(last=False)
+    
+    return {name: values.copy() for name, values in arrays.items()}
+
+def cached_columns(dataframe: pd.DataFrame, key: tuple, compute,
+                   inputs: Tuple[str, ...] = ('close', 'volume')) -> Dict[str, np.ndarray]:
+    """
+    按输入列内容缓存策略的整组指标列
+    key需包含策略名和全部参数；同一行情被重复分析时（如回测中重叠的滑动窗口）直接返回缓存副本
+    """
+    for col in inputs:
+        key = key + _content_key(dataframe[col].to_numpy(dtype=np.float64))
+    return _cached_arrays(key, compute)
+
+def precompute_common(dataframe: pd.DataFrame, rsi_period: int = 14,
+                      volume_period: int = 20) -> Dict[str, np.ndarray]:
+    """
+    计算各策略共用的 rsi / volume_sma / volume_ratio
+    以收盘价和成交量的内容为缓存键，返回数组的副本，调用方可自由修改
+    """
+    close = dataframe['close'].to_numpy(dtype=np.float64)
+    volume = dataframe['volume'].to_numpy(dtype=np.float64)
+    key = ('common', rsi_period, volume_period) + _content_key(close) + _content_key(volume)
+    
+    def compute():
+        volume_sma = calculate_sma(dataframe['volume'], volume_period).to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volume_ratio = volume / volume_sma
+        return {
+            'rsi': calculate_rsi(dataframe['close'], rsi_period).to_numpy(dtype=np.float64),
+            'volume_sma': volume_sma,
+            'volume_ratio': volume_ratio
+        }
+    
+    return _cached_arrays(key, compute)
+
+def shared_ema(data: pd.Series, period: int) -> np.ndarray:
+    """带公共缓存的EMA（与calculate_ema一致），用于各策略重复计算的收盘价EMA"""
+    values = data.to_numpy(dtype=np.float64)
+    key = ('ema', period) + _content_key(values)
+    return _cached_arrays(key, lambda: {'ema': calculate_ema(data, period).to_numpy(dtype=np.float64)})['ema']
+
 def calculate_sma(data: pd.Series, period: int) -> pd.Series:
     """简单移动平均"""
+    # numba内核与pandas逐位一致，实时模式的RollingWindow按相同算法递推
+    if NUMBA_AVAILABLE:
+        return pd.Series(rolling_mean(data.to_numpy(dtype=np.float64), period), index=data.index)
+    # bottleneck要求窗口不超过数据长度，数据不足一个窗口时交给pandas返回全NaN
+    if bn is not None and len(data) >= period:
+        values = bn.move_mean(data.to_numpy(dtype=np.float64), window=period, min_count=period)
+        return pd.Series(values, index=data.index)
     return data.rolling(window=period).mean()
 
+def calculate_rolling_std(data: pd.Series, period: int) -> pd.Series:
+    """滚动标准差（样本标准差，ddof=1，与pandas rolling.std在浮点误差范围内一致）"""
+    # numba内核逐窗口计算，实时模式的RollingWindow.std()对同一窗口调用同一内核
+    if NUMBA_AVAILABLE:
+        return pd.Series(rolling_std(data.to_numpy(dtype=np.float64), period), index=data.index)
+    if bn is not None and len(data) >= period:
+        values = bn.move_std(data.to_numpy(dtype=np.float64), window=period, min_count=period, ddof=1)
+        return pd.Series(values, index=data.index)
+    return data.rolling(window=period).std()
+
+def calculate_rolling_quantile(data: pd.Series, period: int, q: float) -> pd.Series:
+    """滚动分位数（线性插值）"""
+    if NUMBA_AVAILABLE:
+        values = rolling_quantile(data.to_numpy(dtype=np.float64), period, q)
+        return pd.Series(values, index=data.index)
+    return data.rolling(window=period).quantile(q)
+
+def calculate_rolling_min_max(low: pd.Series, high: pd.Series, period: int) -> tuple:
+    """滚动最低价最小值与最高价最大值，返回 (low_min, high_max)"""
+    if NUMBA_AVAILABLE:
+        low_min, high_max = rolling_min_max(
+            low.to_numpy(dtype=np.float64), high.to_numpy(dtype=np.float64), period
+        )
+        return pd.Series(low_min, index=low.index), pd.Series(high_max, index=high.index)
+    return low.rolling(window=period).min(), high.rolling(window=period).max()
+
 def calculate_ema(data: pd.Series, period: int) -> pd.Series:
     """指数移动平均"""
+    if NUMBA_AVAILABLE:
+        return pd.Series(ewm_mean(data.to_numpy(dtype=np.float64), period), index=data.index)
     return data.ewm(span=period).mean()
 
 def calculate_rsi(data: pd.Series, period: int = 14) -> pd.Series:
     """相对强弱指标"""
+    if NUMBA_AVAILABLE:
+        values = data.to_numpy(dtype=np.float64)
+        delta = np.empty_like(values)
+        delta[:1] = np.nan
+        delta[1:] = values[1:] - values[:-1]
+        # 与 delta.where(delta > 0, 0) 一致：NaN与非上涨均记为0，下跌部分取反后为-0.0
+        gain = rolling_mean(np.where(delta > 0, delta, 0.0), period)
+        loss = rolling_mean(-np.where(delta < 0, delta, 0.0), period)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - (100 / (1 + gain / loss))
+        return pd.Series(rsi, index=data.index)
     delta = data.diff()
     gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
     loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
@@ -221,36 +706,59 @@ def calculate_rsi(data: pd.Series, period: int = 14) -> pd.Series:
 def calculate_bollinger_bands(data: pd.Series, period: int = 20, std: float = 2.0) -> tuple:
     """布林带"""
     sma = calculate_sma(data, period)
-    std_dev = data.rolling(window=period).std()
+    std_dev = calculate_rolling_std(data, period)
     upper = sma + (std_dev * std)
     lower = sma - (std_dev * std)
     return upper, sma, lower
 
 def calculate_macd(data: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple:
-    """MACD"""
-    ema_fast = calculate_ema(data, fast)
-    ema_slow = calculate_ema(data, slow)
-    macd_line = ema_fast - ema_slow
-    signal_line = calculate_ema(macd_line, signal)
-    histogram = macd_line - signal_line
-    return macd_line, signal_line, histogram
+    """MACD（使用公共缓存，多个策略在同一行情上计算相同参数的MACD时只计算一次）"""
+    values = data.to_numpy(dtype=np.float64)
+    key = ('macd', fast, slow, signal) + _content_key(values)
+    
+    def compute():
+        macd_line = pd.Series(shared_ema(data, fast) - shared_ema(data, slow), index=data.index)
+        signal_line = calculate_ema(macd_line, signal)
+        histogram = macd_line - signal_line
+        return {
+            'macd': macd_line.to_numpy(dtype=np.float64),
+            'signal': signal_line.to_numpy(dtype=np.float64),
+            'hist': histogram.to_numpy(dtype=np.float64)
+        }
+    
+    arrays = _cached_arrays(key, compute)
+    return (
+        pd.Series(arrays['macd'], index=data.index),
+        pd.Series(arrays['signal'], index=data.index),
+        pd.Series(arrays['hist'], index=data.index)
+    )
 
 def calculate_atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14) -> pd.Series:
     """平均真实范围"""
-    tr1 = high - low
-    tr2 = abs(high - close.shift())
-    tr3 = abs(low - close.shift())
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    return tr.rolling(window=period).mean()
+    h = high.to_numpy(dtype=np.float64)
+    l = low.to_numpy(dtype=np.float64)
+    if len(h) == 0:
+        return pd.Series(np.nan, index=close.index)
+    prev_close = np.empty_like(h)
+    prev_close[0] = np.nan
+    prev_close[1:] = close.to_numpy(dtype=np.float64)[:-1]
+    # fmax跳过NaN，与DataFrame.max(axis=1)在首根K线上的行为一致
+    tr = np.fmax(np.fmax(h - l, np.abs(h - prev_close)), np.abs(l - prev_close))
+    return pd.Series(tr, index=close.index).rolling(window=period).mean()
 
 def calculate_adx(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14) -> tuple:
     """ADX指标"""
     try:
         import talib
+        # 只做一次连续float64数组转换，三个talib调用共用
+        h = np.ascontiguousarray(high.to_numpy(), dtype=np.float64)
+        l = np.ascontiguousarray(low.to_numpy(), dtype=np.float64)
+        c = np.ascontiguousarray(close.to_numpy(), dtype=np.float64)
+        
         # 使用talib计算ADX
-        adx = talib.ADX(high.values, low.values, close.values, timeperiod=period)
-        di_plus = talib.PLUS_DI(high.values, low.values, close.values, timeperiod=period)
-        di_minus = talib.MINUS_DI(high.values, low.values, close.values, timeperiod=period)
+        adx = talib.ADX(h, l, c, timeperiod=period)
+        di_plus = talib.PLUS_DI(h, l, c, timeperiod=period)
+        di_minus = talib.MINUS_DI(h, l, c, timeperiod=period)
         
         # 转换回pandas Series
         adx_series = pd.Series(adx, index=close.index)
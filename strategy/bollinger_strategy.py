@@ -7,9 +7,11 @@ import pandas as pd
 import numpy as np
 from typing import Dict, Any
 from .base_strategy import BaseStrategy, StrategyFactory, Signal, AnalysisResult
+from .base_strategy import IncrementalState, RollingWindow, EWMState
 from .base_strategy import (
-    calculate_sma, calculate_ema, calculate_rsi, 
-    calculate_bollinger_bands, calculate_macd, calculate_atr
+    calculate_sma, precompute_common, shared_ema,
+    calculate_bollinger_bands, calculate_macd, calculate_atr,
+    calculate_rolling_quantile, current_timestamp, get_last_row
 )
 
 @StrategyFactory.register_strategy
@@ -72,40 +74,138 @@ class BollingerStrategy(BaseStrategy):
         dataframe['price_near_lower'] = dataframe['bb_percent'] < self.bb_lower_threshold
         
         # 布林带挤压
-        dataframe['bb_squeeze'] = dataframe['bb_width'] < dataframe['bb_width'].rolling(20).quantile(0.2)
-        dataframe['bb_expansion'] = dataframe['bb_width'] > dataframe['bb_width'].rolling(20).quantile(0.8)
+        dataframe['bb_squeeze'] = dataframe['bb_width'] < calculate_rolling_quantile(dataframe['bb_width'], 20, 0.2)
+        dataframe['bb_expansion'] = dataframe['bb_width'] > calculate_rolling_quantile(dataframe['bb_width'], 20, 0.8)
         
         # RSI
-        dataframe['rsi'] = calculate_rsi(dataframe['close'], self.rsi_period)
+        common = precompute_common(dataframe, self.rsi_period)
+        dataframe['rsi'] = common['rsi']
         
         # 价格趋势
         dataframe['price_momentum'] = (dataframe['close'] - dataframe['close'].shift(5)) / dataframe['close'].shift(5)
         
         # 成交量指标
-        dataframe['volume_sma'] = dataframe['volume'].rolling(window=20).mean()
-        dataframe['volume_ratio'] = dataframe['volume'] / dataframe['volume_sma']
+        dataframe['volume_sma'] = common['volume_sma']
+        dataframe['volume_ratio'] = common['volume_ratio']
         
         # EMA趋势
-        dataframe['ema_20'] = calculate_ema(dataframe['close'], 20)
+        dataframe['ema_20'] = shared_ema(dataframe['close'], 20)
         dataframe['price_vs_ema'] = dataframe['close'] / dataframe['ema_20'] - 1
         
         return dataframe
     
+    def warmup(self, dataframe: pd.DataFrame) -> AnalysisResult:
+        """实时模式初始化：批量计算一次指标，并由末尾K线建立增量状态"""
+        if not self.validate_data(dataframe):
+            self._state = None
+            return super().warmup(dataframe)
+        
+        dataframe = self.calculate_indicators(self.preprocess_data(dataframe.copy()))
+        
+        close = dataframe['close']
+        state = IncrementalState()
+        state.windows['close'] = RollingWindow.from_values(close, self.bb_period)
+        state.windows['bb_width'] = RollingWindow.from_values(dataframe['bb_width'], 20)
+        state.seed_rsi(close, self.rsi_period)
+        state.windows['momentum'] = RollingWindow.from_values(close, 5)
+        state.seed_volume(dataframe['volume'])
+        state.ewms['ema_20'] = EWMState.from_last(dataframe['ema_20'].iloc[-1], len(dataframe), 20)
+        state.last_row = dataframe.iloc[-1].to_dict()
+        
+        self._state = state
+        self._history = None
+        return self._finalize_result(self.generate_signal(dataframe.iloc[-2:]))
+    
+    def analyze_tick(self, row: Dict[str, Any]) -> AnalysisResult:
+        """实时模式：以增量状态更新计算新K线的指标（标准差和分位数按固定长度窗口计算），仅对最后一根K线生成信号"""
+        if self._state is None:
+            return self._analyze_tick_until_warm(row)
+        
+        new_row = self._parse_tick(row)
+        if new_row is None:
+            return self._invalid_tick_result()
+        
+        close = np.float64(new_row['close'])
+        state = self._state
+        windows = state.windows
+        prev_close = state.last_row['close']
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # 布林带
+            windows['close'].push(close)
+            bb_middle = np.float64(windows['close'].mean)
+            bb_std = windows['close'].std()
+            bb_upper = bb_middle + (bb_std * self.bb_std)
+            bb_lower = bb_middle - (bb_std * self.bb_std)
+            bb_width = (bb_upper - bb_lower) / bb_middle
+            bb_percent = (close - bb_lower) / (bb_upper - bb_lower)
+            
+            # 布林带挤压
+            windows['bb_width'].push(bb_width)
+            width_low = windows['bb_width'].quantile(0.2)
+            width_high = windows['bb_width'].quantile(0.8)
+            
+            # RSI
+            rsi = state.push_rsi(close - prev_close)
+            
+            # 价格趋势
+            close_5 = windows['momentum'].values()[0]
+            windows['momentum'].push(close)
+            price_momentum = (close - close_5) / close_5
+            
+            # 成交量指标
+            volume_sma, volume_ratio = state.push_volume(new_row['volume'])
+            
+            # EMA趋势
+            ema_20 = state.ewms['ema_20'].push(close)
+            price_vs_ema = close / ema_20 - 1
+        
+        new_row.update({
+            'bb_upper': bb_upper,
+            'bb_middle': bb_middle,
+            'bb_lower': bb_lower,
+            'bb_width': bb_width,
+            'bb_percent': bb_percent,
+            'price_above_upper': close > bb_upper,
+            'price_below_lower': close < bb_lower,
+            'price_near_upper': bb_percent > self.bb_upper_threshold,
+            'price_near_lower': bb_percent < self.bb_lower_threshold,
+            'bb_squeeze': bb_width < width_low,
+            'bb_expansion': bb_width > width_high,
+            'rsi': rsi,
+            'price_momentum': price_momentum,
+            'volume_sma': volume_sma,
+            'volume_ratio': volume_ratio,
+            'ema_20': ema_20,
+            'price_vs_ema': price_vs_ema
+        })
+        
+        prev_row = state.last_row
+        state.last_row = new_row
+        return self._finalize_result(self.generate_signal_from_row(new_row, prev_row, current_timestamp()))
+    
     def generate_signal(self, dataframe: pd.DataFrame) -> AnalysisResult:
         """生成交易信号"""
         
+        now_str = current_timestamp()
+        
         if len(dataframe) == 0:
             return AnalysisResult(
                 signal=Signal.HOLD,
                 confidence=0.0,
                 reasons=["数据不足"],
                 indicators={},
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # 获取最新数据
-        last_row = dataframe.iloc[-1]
-        prev_row = dataframe.iloc[-2] if len(dataframe) > 1 else last_row
+        last_row = get_last_row(dataframe)
+        prev_row = get_last_row(dataframe, -2) if len(dataframe) > 1 else last_row
+        return self.generate_signal_from_row(last_row, prev_row, now_str)
+    
+    def generate_signal_from_row(self, last_row: Dict[str, Any], prev_row: Dict[str, Any],
+                                 now_str: str) -> AnalysisResult:
+        """由最新两根K线的 {列名: 值} 字典生成交易信号"""
         
         # 提取关键指标
         indicators = {
@@ -148,7 +248,7 @@ class BollingerStrategy(BaseStrategy):
                 confidence=min(confidence, 1.0),
                 reasons=reasons,
                 indicators=indicators,
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # 卖出信号检测 - 价格接近或突破上轨
@@ -178,7 +278,7 @@ class BollingerStrategy(BaseStrategy):
                 confidence=min(confidence, 1.0),
                 reasons=reasons,
                 indicators=indicators,
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # 中轨支撑/阻力
@@ -190,7 +290,7 @@ class BollingerStrategy(BaseStrategy):
                     confidence=0.5,
                     reasons=reasons,
                     indicators=indicators,
-                    timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                    timestamp=now_str
                 )
             elif last_row.get('price_vs_ema', 0) < 0 and indicators['rsi'] < 50:
                 reasons = ["价格在中轨附近", "趋势偏空", f"RSI({indicators['rsi']:.1f})中性偏弱"]
@@ -199,7 +299,7 @@ class BollingerStrategy(BaseStrategy):
                     confidence=0.5,
                     reasons=reasons,
                     indicators=indicators,
-                    timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                    timestamp=now_str
                 )
         
         # 默认观望
@@ -209,5 +309,5 @@ class BollingerStrategy(BaseStrategy):
             confidence=0.5,
             reasons=reasons,
             indicators=indicators,
-            timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+            timestamp=now_str
         )
\ No newline at end of file
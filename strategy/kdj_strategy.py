@@ -3,9 +3,19 @@ KDJ随机指标策略
 基于KDJ指标的超买超卖和金叉死叉信号
 """
 
+import numpy as np
 import pandas as pd
+from typing import Dict, Any
 from .base_strategy import BaseStrategy, StrategyFactory, Signal, AnalysisResult
-from .base_strategy import calculate_ema, calculate_rsi
+from .base_strategy import IncrementalState, RollingWindow, EWMState
+from .base_strategy import get_last_row, current_timestamp
+from .base_strategy import append_columns, precompute_common, shared_ema, detect_crosses, is_rising, is_falling, calculate_rolling_min_max
+from ._kernels import NUMBA_AVAILABLE, KDJ_FLAG_COLUMNS, ema_recursive, kdj_flags, kdj_recursive
+
+try:
+    from scipy.signal import lfilter
+except ImportError:  # scipy为可选依赖，不可用时使用递推内核
+    lfilter = None
 
 @StrategyFactory.register_strategy
 class KDJStrategy(BaseStrategy):
@@ -44,107 +54,209 @@ class KDJStrategy(BaseStrategy):
     def get_strategy_description(self) -> str:
         return "基于KDJ指标的金叉死叉和超买超卖信号"
     
-    def calculate_kdj(self, dataframe: pd.DataFrame) -> pd.DataFrame:
-        """计算KDJ指标"""
+    @staticmethod
+    def _smooth(values: np.ndarray, init: float) -> np.ndarray:
+        """
+        KDJ平滑递推: x = 2/3 * x_prev + 1/3 * value，遇到NaN时沿用上一个值
+        等价于一阶IIR滤波，scipy可用时交给lfilter在C层完成，否则使用numba内核
+        """
+        nan_mask = np.isnan(values)
+        if len(values) == 0 or nan_mask.all():
+            return np.full(len(values), init)
+        
+        # 前导NaN保持初始值，递推只处理首个有效值之后的部分
+        first = int(np.argmax(~nan_mask))
+        out = np.empty(len(values))
+        out[:first] = init
+        if lfilter is not None and not nan_mask[first:].any():
+            out[first:] = lfilter([1 / 3], [1.0, -2 / 3], values[first:], zi=[(2 / 3) * init])[0]
+        else:
+            out[first:] = ema_recursive(values[first:], 1 / 3, init)
+        return out
+    
+    def kdj_columns(self, dataframe: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """计算K/D/J数组"""
         
         # 计算RSV (Raw Stochastic Value)
-        low_min = dataframe['low'].rolling(window=self.kdj_period).min()
-        high_max = dataframe['high'].rolling(window=self.kdj_period).max()
+        low_min, high_max = calculate_rolling_min_max(dataframe['low'], dataframe['high'], self.kdj_period)
         
         rsv = (dataframe['close'] - low_min) / (high_max - low_min) * 100
         
-        # 计算K值 (K = 2/3 * K_prev + 1/3 * RSV)
-        k_values = []
-        k_prev = 50  # 初始值
-        
-        for rsv_val in rsv:
-            if pd.isna(rsv_val):
-                k_values.append(k_prev)
-            else:
-                k_current = (2/3) * k_prev + (1/3) * rsv_val
-                k_values.append(k_current)
-                k_prev = k_current
-        
-        dataframe['k'] = pd.Series(k_values, index=dataframe.index)
-        
-        # 计算D值 (D = 2/3 * D_prev + 1/3 * K)
-        d_values = []
-        d_prev = 50  # 初始值
+        # 计算K值 (K = 2/3 * K_prev + 1/3 * RSV) 与D值 (D = 2/3 * D_prev + 1/3 * K)
+        rsv = rsv.to_numpy(dtype=float)
+        if NUMBA_AVAILABLE:
+            k, d = kdj_recursive(rsv, 50.0)
+        else:
+            k = self._smooth(rsv, 50.0)
+            d = self._smooth(k, 50.0)
         
-        for k_val in dataframe['k']:
-            if pd.isna(k_val):
-                d_values.append(d_prev)
-            else:
-                d_current = (2/3) * d_prev + (1/3) * k_val
-                d_values.append(d_current)
-                d_prev = d_current
+        # 计算J值 (J = 3K - 2D)
+        j = 3 * k - 2 * d
         
-        dataframe['d'] = pd.Series(d_values, index=dataframe.index)
+        return {'k': k, 'd': d, 'j': j}
+    
+    def kdj_signal_columns(self, k: np.ndarray, d: np.ndarray, j: np.ndarray) -> Dict[str, np.ndarray]:
+        """计算KDJ布尔信号数组，numba可用时由单个内核一次遍历完成"""
         
-        # 计算J值 (J = 3K - 2D)
-        dataframe['j'] = 3 * dataframe['k'] - 2 * dataframe['d']
+        if NUMBA_AVAILABLE:
+            flags = kdj_flags(k, d, j, float(self.oversold_threshold), float(self.overbought_threshold))
+            return {col: flags[i] for i, col in enumerate(KDJ_FLAG_COLUMNS)}
         
-        return dataframe
+        golden_cross, death_cross = detect_crosses(k, d)
+        return {
+            'k_above_d': k > d,
+            'k_below_d': k < d,
+            
+            # 金叉死叉检测
+            'kdj_golden_cross': golden_cross,
+            'kdj_death_cross': death_cross,
+            
+            # 超买超卖区域
+            'kdj_oversold': (k < self.oversold_threshold) & (d < self.oversold_threshold),
+            'kdj_overbought': (k > self.overbought_threshold) & (d > self.overbought_threshold),
+            
+            # J值极值
+            'j_oversold': j < 0,
+            'j_overbought': j > 100,
+            
+            # KDJ趋势
+            'kdj_rising': is_rising(k) & is_rising(d),
+            'kdj_falling': is_falling(k) & is_falling(d)
+        }
+    
+    def calculate_kdj(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """计算KDJ指标"""
+        return append_columns(dataframe, self.kdj_columns(dataframe))
+    
+    def calculate_kdj_signals(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """计算KDJ布尔信号"""
+        return append_columns(dataframe, self.kdj_signal_columns(
+            dataframe['k'].to_numpy(dtype=np.float64),
+            dataframe['d'].to_numpy(dtype=np.float64),
+            dataframe['j'].to_numpy(dtype=np.float64)
+        ))
     
     def calculate_indicators(self, dataframe: pd.DataFrame) -> pd.DataFrame:
         """计算技术指标"""
         
         # KDJ指标
-        dataframe = self.calculate_kdj(dataframe)
+        columns = self.kdj_columns(dataframe)
         
         # KDJ信号
-        dataframe['k_above_d'] = dataframe['k'] > dataframe['d']
-        dataframe['k_below_d'] = dataframe['k'] < dataframe['d']
-        
-        # 金叉死叉检测
-        dataframe['kdj_golden_cross'] = (
-            (dataframe['k'] > dataframe['d']) & 
-            (dataframe['k'].shift(1) <= dataframe['d'].shift(1))
-        )
-        dataframe['kdj_death_cross'] = (
-            (dataframe['k'] < dataframe['d']) & 
-            (dataframe['k'].shift(1) >= dataframe['d'].shift(1))
-        )
-        
-        # 超买超卖区域
-        dataframe['kdj_oversold'] = (dataframe['k'] < self.oversold_threshold) & (dataframe['d'] < self.oversold_threshold)
-        dataframe['kdj_overbought'] = (dataframe['k'] > self.overbought_threshold) & (dataframe['d'] > self.overbought_threshold)
-        
-        # J值极值
-        dataframe['j_oversold'] = dataframe['j'] < 0
-        dataframe['j_overbought'] = dataframe['j'] > 100
-        
-        # KDJ趋势
-        dataframe['kdj_rising'] = (dataframe['k'] > dataframe['k'].shift(1)) & (dataframe['d'] > dataframe['d'].shift(1))
-        dataframe['kdj_falling'] = (dataframe['k'] < dataframe['k'].shift(1)) & (dataframe['d'] < dataframe['d'].shift(1))
+        columns.update(self.kdj_signal_columns(columns['k'], columns['d'], columns['j']))
         
         # RSI辅助
-        dataframe['rsi'] = calculate_rsi(dataframe['close'], self.rsi_period)
+        common = precompute_common(dataframe, self.rsi_period)
+        columns['rsi'] = common['rsi']
         
         # 成交量指标
-        dataframe['volume_sma'] = dataframe['volume'].rolling(window=20).mean()
-        dataframe['volume_ratio'] = dataframe['volume'] / dataframe['volume_sma']
+        columns['volume_sma'] = common['volume_sma']
+        columns['volume_ratio'] = common['volume_ratio']
         
         # 价格趋势
-        dataframe['ema_20'] = calculate_ema(dataframe['close'], 20)
-        dataframe['price_trend_up'] = dataframe['close'] > dataframe['ema_20']
+        ema_20 = shared_ema(dataframe['close'], 20)
+        columns['ema_20'] = ema_20
+        columns['price_trend_up'] = dataframe['close'].to_numpy() > ema_20
         
-        return dataframe
+        return self.downcast_indicators(append_columns(dataframe, columns))
+    
+    def warmup(self, dataframe: pd.DataFrame) -> AnalysisResult:
+        """实时模式初始化：批量计算一次指标，并由末尾K线建立增量状态"""
+        if not self.validate_data(dataframe):
+            self._state = None
+            return super().warmup(dataframe)
+        
+        dataframe = self.calculate_indicators(self.preprocess_data(dataframe.copy()))
+        
+        state = IncrementalState()
+        state.windows['low'] = RollingWindow.from_values(dataframe['low'], self.kdj_period)
+        state.windows['high'] = RollingWindow.from_values(dataframe['high'], self.kdj_period)
+        state.seed_rsi(dataframe['close'], self.rsi_period)
+        state.seed_volume(dataframe['volume'])
+        state.ewms['ema_20'] = EWMState.from_last(dataframe['ema_20'].iloc[-1], len(dataframe), 20)
+        state.last_row = dataframe.iloc[-1].to_dict()
+        
+        self._state = state
+        self._history = None
+        return self._finalize_result(self.generate_signal(dataframe.iloc[-1:]))
+    
+    def analyze_tick(self, row: Dict[str, Any]) -> AnalysisResult:
+        """实时模式：由上一根K线的K/D值递推新K线的指标，仅对最后一根K线生成信号"""
+        if self._state is None:
+            return self._analyze_tick_until_warm(row)
+        
+        new_row = self._parse_tick(row)
+        if new_row is None:
+            return self._invalid_tick_result()
+        
+        close = np.float64(new_row['close'])
+        state = self._state
+        windows = state.windows
+        prev = state.last_row
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # KDJ
+            windows['low'].push(new_row['low'])
+            windows['high'].push(new_row['high'])
+            low_min = windows['low'].values().min()
+            high_max = windows['high'].values().max()
+            rsv = (close - low_min) / (high_max - low_min) * 100
+            
+            k = prev['k'] if np.isnan(rsv) else (2/3) * prev['k'] + (1/3) * rsv
+            d = (2/3) * prev['d'] + (1/3) * k
+            j = 3 * k - 2 * d
+            
+            # RSI辅助
+            rsi = state.push_rsi(close - prev['close'])
+            
+            # 成交量指标
+            volume_sma, volume_ratio = state.push_volume(new_row['volume'])
+            
+            # 价格趋势
+            ema_20 = state.ewms['ema_20'].push(close)
+        
+        new_row.update({
+            'k': k,
+            'd': d,
+            'j': j,
+            'k_above_d': k > d,
+            'k_below_d': k < d,
+            'kdj_golden_cross': k > d and prev['k'] <= prev['d'],
+            'kdj_death_cross': k < d and prev['k'] >= prev['d'],
+            'kdj_oversold': k < self.oversold_threshold and d < self.oversold_threshold,
+            'kdj_overbought': k > self.overbought_threshold and d > self.overbought_threshold,
+            'j_oversold': j < 0,
+            'j_overbought': j > 100,
+            'kdj_rising': k > prev['k'] and d > prev['d'],
+            'kdj_falling': k < prev['k'] and d < prev['d'],
+            'rsi': rsi,
+            'volume_sma': volume_sma,
+            'volume_ratio': volume_ratio,
+            'ema_20': ema_20,
+            'price_trend_up': close > ema_20
+        })
+        
+        state.last_row = new_row
+        return self._finalize_result(self.generate_signal_from_row(new_row, current_timestamp()))
     
     def generate_signal(self, dataframe: pd.DataFrame) -> AnalysisResult:
         """生成交易信号"""
         
+        now_str = current_timestamp()
+        
         if len(dataframe) == 0:
             return AnalysisResult(
                 signal=Signal.HOLD,
                 confidence=0.0,
                 reasons=["数据不足"],
                 indicators={},
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
-        # 获取最新数据
-        last_row = dataframe.iloc[-1]
+        return self.generate_signal_from_row(get_last_row(dataframe), now_str)
+    
+    def generate_signal_from_row(self, last_row: Dict[str, Any], now_str: str) -> AnalysisResult:
+        """由最新一根K线的 {列名: 值} 字典生成交易信号"""
         
         # 提取关键指标
         indicators = {
@@ -181,7 +293,7 @@ class KDJStrategy(BaseStrategy):
                 confidence=min(confidence, 1.0),
                 reasons=reasons,
                 indicators=indicators,
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # 一般买入信号
@@ -202,7 +314,7 @@ class KDJStrategy(BaseStrategy):
                 confidence=min(confidence, 1.0),
                 reasons=reasons,
                 indicators=indicators,
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # 卖出信号检测
@@ -228,7 +340,7 @@ class KDJStrategy(BaseStrategy):
                 confidence=min(confidence, 1.0),
                 reasons=reasons,
                 indicators=indicators,
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # 一般卖出信号
@@ -249,7 +361,7 @@ class KDJStrategy(BaseStrategy):
                 confidence=min(confidence, 1.0),
                 reasons=reasons,
                 indicators=indicators,
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # 持续信号
@@ -261,7 +373,7 @@ class KDJStrategy(BaseStrategy):
                     confidence=0.55,
                     reasons=reasons,
                     indicators=indicators,
-                    timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                    timestamp=now_str
                 )
         
         elif last_row.get('k_below_d', False) and last_row.get('kdj_falling', False):
@@ -272,7 +384,7 @@ class KDJStrategy(BaseStrategy):
                     confidence=0.55,
                     reasons=reasons,
                     indicators=indicators,
-                    timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                    timestamp=now_str
                 )
         
         # 默认观望
@@ -282,5 +394,5 @@ class KDJStrategy(BaseStrategy):
             confidence=0.5,
             reasons=reasons,
             indicators=indicators,
-            timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+            timestamp=now_str
         )
\ No newline at end of file
@@ -3,9 +3,13 @@
 基于快慢均线的金叉死叉信号
 """
 
+import numpy as np
 import pandas as pd
+from typing import Dict, Any
 from .base_strategy import BaseStrategy, StrategyFactory, Signal, AnalysisResult
-from .base_strategy import calculate_sma, calculate_ema, calculate_rsi, calculate_macd
+from .base_strategy import IncrementalState, RollingWindow, EWMState
+from .base_strategy import calculate_sma, calculate_macd, get_last_row, current_timestamp
+from .base_strategy import append_columns, precompute_common, shared_ema, detect_crosses, is_rising
 
 @StrategyFactory.register_strategy
 class MACrossoverStrategy(BaseStrategy):
@@ -44,68 +48,155 @@ class MACrossoverStrategy(BaseStrategy):
     def calculate_indicators(self, dataframe: pd.DataFrame) -> pd.DataFrame:
         """计算技术指标"""
         
+        close = dataframe['close'].to_numpy()
+        
         # 移动平均线
-        dataframe['ma_fast'] = calculate_ema(dataframe['close'], self.ma_fast)
-        dataframe['ma_slow'] = calculate_ema(dataframe['close'], self.ma_slow)
+        ma_fast = shared_ema(dataframe['close'], self.ma_fast)
+        ma_slow = shared_ema(dataframe['close'], self.ma_slow)
+        columns = {'ma_fast': ma_fast, 'ma_slow': ma_slow}
         
         # 均线关系
-        dataframe['ma_fast_above_slow'] = dataframe['ma_fast'] > dataframe['ma_slow']
-        dataframe['ma_gap'] = (dataframe['ma_fast'] - dataframe['ma_slow']) / dataframe['ma_slow']
+        columns['ma_fast_above_slow'] = ma_fast > ma_slow
+        columns['ma_gap'] = (ma_fast - ma_slow) / ma_slow
         
         # 金叉死叉检测
-        dataframe['golden_cross'] = (
-            (dataframe['ma_fast'] > dataframe['ma_slow']) & 
-            (dataframe['ma_fast'].shift(1) <= dataframe['ma_slow'].shift(1))
-        )
-        dataframe['death_cross'] = (
-            (dataframe['ma_fast'] < dataframe['ma_slow']) & 
-            (dataframe['ma_fast'].shift(1) >= dataframe['ma_slow'].shift(1))
-        )
+        columns['golden_cross'], columns['death_cross'] = detect_crosses(ma_fast, ma_slow)
         
         # 价格与均线关系
-        dataframe['price_above_ma_fast'] = dataframe['close'] > dataframe['ma_fast']
-        dataframe['price_above_ma_slow'] = dataframe['close'] > dataframe['ma_slow']
-        dataframe['price_between_ma'] = (
-            (dataframe['close'] > dataframe['ma_fast']) & 
-            (dataframe['close'] < dataframe['ma_slow'])
+        columns['price_above_ma_fast'] = close > ma_fast
+        columns['price_above_ma_slow'] = close > ma_slow
+        columns['price_between_ma'] = (
+            (close > ma_fast) & (close < ma_slow)
         ) | (
-            (dataframe['close'] < dataframe['ma_fast']) & 
-            (dataframe['close'] > dataframe['ma_slow'])
+            (close < ma_fast) & (close > ma_slow)
         )
         
         # 均线趋势
-        dataframe['ma_fast_rising'] = dataframe['ma_fast'] > dataframe['ma_fast'].shift(3)
-        dataframe['ma_slow_rising'] = dataframe['ma_slow'] > dataframe['ma_slow'].shift(5)
+        columns['ma_fast_rising'] = is_rising(ma_fast, 3)
+        columns['ma_slow_rising'] = is_rising(ma_slow, 5)
         
         # RSI
-        dataframe['rsi'] = calculate_rsi(dataframe['close'], self.rsi_period)
+        common = precompute_common(dataframe, self.rsi_period)
+        columns['rsi'] = common['rsi']
         
         # 成交量指标
-        dataframe['volume_sma'] = dataframe['volume'].rolling(window=20).mean()
-        dataframe['volume_ratio'] = dataframe['volume'] / dataframe['volume_sma']
+        columns['volume_sma'] = common['volume_sma']
+        columns['volume_ratio'] = common['volume_ratio']
         
         # MACD辅助
         macd_line, signal_line, histogram = calculate_macd(dataframe['close'])
-        dataframe['macd'] = macd_line
-        dataframe['macd_signal'] = signal_line
-        dataframe['macd_bullish'] = dataframe['macd'] > dataframe['macd_signal']
+        columns['macd'] = macd_line.to_numpy()
+        columns['macd_signal'] = signal_line.to_numpy()
+        columns['macd_bullish'] = columns['macd'] > columns['macd_signal']
+        
+        return self.downcast_indicators(append_columns(dataframe, columns))
+    
+    def warmup(self, dataframe: pd.DataFrame) -> AnalysisResult:
+        """实时模式初始化：批量计算一次指标，并由末尾K线建立增量状态"""
+        if not self.validate_data(dataframe):
+            self._state = None
+            return super().warmup(dataframe)
+        
+        dataframe = self.calculate_indicators(self.preprocess_data(dataframe.copy()))
+        count = len(dataframe)
+        
+        state = IncrementalState()
+        state.ewms['ma_fast'] = EWMState.from_last(dataframe['ma_fast'].iloc[-1], count, self.ma_fast)
+        state.ewms['ma_slow'] = EWMState.from_last(dataframe['ma_slow'].iloc[-1], count, self.ma_slow)
+        state.windows['ma_fast'] = RollingWindow.from_values(dataframe['ma_fast'], 3)
+        state.windows['ma_slow'] = RollingWindow.from_values(dataframe['ma_slow'], 5)
+        state.seed_rsi(dataframe['close'], self.rsi_period)
+        state.seed_volume(dataframe['volume'])
+        
+        # MACD辅助（calculate_macd默认参数12/26/9）
+        close = dataframe['close']
+        state.ewms['macd_fast'] = EWMState.from_last(shared_ema(close, 12)[-1], count, 12)
+        state.ewms['macd_slow'] = EWMState.from_last(shared_ema(close, 26)[-1], count, 26)
+        state.ewms['macd_signal'] = EWMState.from_last(dataframe['macd_signal'].iloc[-1], count, 9)
+        state.last_row = dataframe.iloc[-1].to_dict()
+        
+        self._state = state
+        self._history = None
+        return self._finalize_result(self.generate_signal(dataframe.iloc[-1:]))
+    
+    def analyze_tick(self, row: Dict[str, Any]) -> AnalysisResult:
+        """实时模式：以EMA递推更新均线和MACD，仅对最后一根K线生成信号"""
+        if self._state is None:
+            return self._analyze_tick_until_warm(row)
         
-        return dataframe
+        new_row = self._parse_tick(row)
+        if new_row is None:
+            return self._invalid_tick_result()
+        
+        close = np.float64(new_row['close'])
+        state = self._state
+        windows = state.windows
+        ewms = state.ewms
+        prev = state.last_row
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # 移动平均线
+            ma_fast = ewms['ma_fast'].push(close)
+            ma_slow = ewms['ma_slow'].push(close)
+            ma_gap = (ma_fast - ma_slow) / ma_slow
+            
+            # 均线趋势（与3根/5根之前的均线比较）
+            ma_fast_3 = windows['ma_fast'].values()[0]
+            ma_slow_5 = windows['ma_slow'].values()[0]
+            windows['ma_fast'].push(ma_fast)
+            windows['ma_slow'].push(ma_slow)
+            
+            # RSI
+            rsi = state.push_rsi(close - prev['close'])
+            
+            # 成交量指标
+            volume_sma, volume_ratio = state.push_volume(new_row['volume'])
+            
+            # MACD辅助
+            macd = ewms['macd_fast'].push(close) - ewms['macd_slow'].push(close)
+            macd_signal = ewms['macd_signal'].push(macd)
+        
+        new_row.update({
+            'ma_fast': ma_fast,
+            'ma_slow': ma_slow,
+            'ma_fast_above_slow': ma_fast > ma_slow,
+            'ma_gap': ma_gap,
+            'golden_cross': ma_fast > ma_slow and prev['ma_fast'] <= prev['ma_slow'],
+            'death_cross': ma_fast < ma_slow and prev['ma_fast'] >= prev['ma_slow'],
+            'price_above_ma_fast': close > ma_fast,
+            'price_above_ma_slow': close > ma_slow,
+            'price_between_ma': (ma_fast < close < ma_slow) or (ma_slow < close < ma_fast),
+            'ma_fast_rising': ma_fast > ma_fast_3,
+            'ma_slow_rising': ma_slow > ma_slow_5,
+            'rsi': rsi,
+            'volume_sma': volume_sma,
+            'volume_ratio': volume_ratio,
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_bullish': macd > macd_signal
+        })
+        
+        state.last_row = new_row
+        return self._finalize_result(self.generate_signal_from_row(new_row, current_timestamp()))
     
     def generate_signal(self, dataframe: pd.DataFrame) -> AnalysisResult:
         """生成交易信号"""
         
+        now_str = current_timestamp()
+        
         if len(dataframe) == 0:
             return AnalysisResult(
                 signal=Signal.HOLD,
                 confidence=0.0,
                 reasons=["数据不足"],
                 indicators={},
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
-        # 获取最新数据
-        last_row = dataframe.iloc[-1]
+        return self.generate_signal_from_row(get_last_row(dataframe), now_str)
+    
+    def generate_signal_from_row(self, last_row: Dict[str, Any], now_str: str) -> AnalysisResult:
+        """由最新一根K线的 {列名: 值} 字典生成交易信号"""
         
         # 提取关键指标
         indicators = {
@@ -150,7 +241,7 @@ class MACrossoverStrategy(BaseStrategy):
                 confidence=min(confidence, 1.0),
                 reasons=reasons,
                 indicators=indicators,
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # 卖出信号检测 - 死叉
@@ -184,7 +275,7 @@ class MACrossoverStrategy(BaseStrategy):
                 confidence=min(confidence, 1.0),
                 reasons=reasons,
                 indicators=indicators,
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # 趋势跟随信号
@@ -198,7 +289,7 @@ class MACrossoverStrategy(BaseStrategy):
                     confidence=0.6,
                     reasons=reasons,
                     indicators=indicators,
-                    timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                    timestamp=now_str
                 )
         
         elif not last_row.get('ma_fast_above_slow', True):
@@ -211,7 +302,7 @@ class MACrossoverStrategy(BaseStrategy):
                     confidence=0.6,
                     reasons=reasons,
                     indicators=indicators,
-                    timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                    timestamp=now_str
                 )
         
         # 默认观望
@@ -221,5 +312,5 @@ class MACrossoverStrategy(BaseStrategy):
             confidence=0.5,
             reasons=reasons,
             indicators=indicators,
-            timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+            timestamp=now_str
         )
\ No newline at end of file
@@ -7,9 +7,11 @@ import pandas as pd
 import numpy as np
 from typing import Dict, Any
 from .base_strategy import BaseStrategy, StrategyFactory, Signal, AnalysisResult
+from .base_strategy import IncrementalState, EWMState
 from .base_strategy import (
-    calculate_sma, calculate_ema, calculate_rsi, 
-    calculate_bollinger_bands, calculate_macd, calculate_atr
+    calculate_sma, precompute_common, shared_ema,
+    calculate_bollinger_bands, calculate_macd, calculate_atr, get_last_row, current_timestamp,
+    append_columns, detect_crosses, is_rising, is_falling
 )
 
 @StrategyFactory.register_strategy
@@ -54,57 +56,132 @@ class MACDStrategy(BaseStrategy):
         macd_line, signal_line, histogram = calculate_macd(
             dataframe['close'], self.macd_fast, self.macd_slow, self.macd_signal
         )
-        dataframe['macd'] = macd_line
-        dataframe['macd_signal'] = signal_line
-        dataframe['macd_hist'] = histogram
+        macd = macd_line.to_numpy()
+        macd_signal = signal_line.to_numpy()
+        macd_hist = histogram.to_numpy()
+        columns = {'macd': macd, 'macd_signal': macd_signal, 'macd_hist': macd_hist}
         
         # MACD信号
-        dataframe['macd_above_signal'] = dataframe['macd'] > dataframe['macd_signal']
-        dataframe['macd_below_signal'] = dataframe['macd'] < dataframe['macd_signal']
+        columns['macd_above_signal'] = macd > macd_signal
+        columns['macd_below_signal'] = macd < macd_signal
         
         # 金叉死叉检测
-        dataframe['macd_golden_cross'] = (
-            (dataframe['macd'] > dataframe['macd_signal']) & 
-            (dataframe['macd'].shift(1) <= dataframe['macd_signal'].shift(1))
-        )
-        dataframe['macd_death_cross'] = (
-            (dataframe['macd'] < dataframe['macd_signal']) & 
-            (dataframe['macd'].shift(1) >= dataframe['macd_signal'].shift(1))
-        )
+        columns['macd_golden_cross'], columns['macd_death_cross'] = detect_crosses(macd, macd_signal)
         
         # MACD直方图趋势
-        dataframe['macd_hist_rising'] = dataframe['macd_hist'] > dataframe['macd_hist'].shift(1)
-        dataframe['macd_hist_falling'] = dataframe['macd_hist'] < dataframe['macd_hist'].shift(1)
+        columns['macd_hist_rising'] = is_rising(macd_hist)
+        columns['macd_hist_falling'] = is_falling(macd_hist)
         
         # RSI
-        dataframe['rsi'] = calculate_rsi(dataframe['close'], self.rsi_period)
+        common = precompute_common(dataframe, self.rsi_period)
+        columns['rsi'] = common['rsi']
         
         # 成交量指标
-        dataframe['volume_sma'] = dataframe['volume'].rolling(window=20).mean()
-        dataframe['volume_ratio'] = dataframe['volume'] / dataframe['volume_sma']
+        columns['volume_sma'] = common['volume_sma']
+        columns['volume_ratio'] = common['volume_ratio']
         
         # EMA趋势
-        dataframe['ema_fast'] = calculate_ema(dataframe['close'], 12)
-        dataframe['ema_slow'] = calculate_ema(dataframe['close'], 26)
-        dataframe['ema_trend_up'] = dataframe['ema_fast'] > dataframe['ema_slow']
+        ema_fast = shared_ema(dataframe['close'], 12)
+        ema_slow = shared_ema(dataframe['close'], 26)
+        columns['ema_fast'] = ema_fast
+        columns['ema_slow'] = ema_slow
+        columns['ema_trend_up'] = ema_fast > ema_slow
         
-        return dataframe
+        return self.downcast_indicators(append_columns(dataframe, columns))
+    
+    def warmup(self, dataframe: pd.DataFrame) -> AnalysisResult:
+        """实时模式初始化：批量计算一次指标，并由末尾K线建立增量状态"""
+        if not self.validate_data(dataframe):
+            self._state = None
+            return super().warmup(dataframe)
+        
+        dataframe = self.calculate_indicators(self.preprocess_data(dataframe.copy()))
+        close = dataframe['close']
+        count = len(dataframe)
+        
+        state = IncrementalState()
+        state.ewms['macd_fast'] = EWMState.from_last(shared_ema(close, self.macd_fast)[-1], count, self.macd_fast)
+        state.ewms['macd_slow'] = EWMState.from_last(shared_ema(close, self.macd_slow)[-1], count, self.macd_slow)
+        state.ewms['macd_signal'] = EWMState.from_last(dataframe['macd_signal'].iloc[-1], count, self.macd_signal)
+        state.ewms['ema_fast'] = EWMState.from_last(dataframe['ema_fast'].iloc[-1], count, 12)
+        state.ewms['ema_slow'] = EWMState.from_last(dataframe['ema_slow'].iloc[-1], count, 26)
+        state.seed_rsi(close, self.rsi_period)
+        state.seed_volume(dataframe['volume'])
+        state.last_row = dataframe.iloc[-1].to_dict()
+        
+        self._state = state
+        self._history = None
+        return self._finalize_result(self.generate_signal(dataframe.iloc[-1:]))
+    
+    def analyze_tick(self, row: Dict[str, Any]) -> AnalysisResult:
+        """实时模式：以EMA递推更新MACD，仅对最后一根K线生成信号"""
+        if self._state is None:
+            return self._analyze_tick_until_warm(row)
+        
+        new_row = self._parse_tick(row)
+        if new_row is None:
+            return self._invalid_tick_result()
+        
+        close = np.float64(new_row['close'])
+        state = self._state
+        ewms = state.ewms
+        prev = state.last_row
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # MACD
+            macd = ewms['macd_fast'].push(close) - ewms['macd_slow'].push(close)
+            macd_signal = ewms['macd_signal'].push(macd)
+            macd_hist = macd - macd_signal
+            
+            # RSI
+            rsi = state.push_rsi(close - prev['close'])
+            
+            # 成交量指标
+            volume_sma, volume_ratio = state.push_volume(new_row['volume'])
+            
+            # EMA趋势
+            ema_fast = ewms['ema_fast'].push(close)
+            ema_slow = ewms['ema_slow'].push(close)
+        
+        new_row.update({
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_hist': macd_hist,
+            'macd_above_signal': macd > macd_signal,
+            'macd_below_signal': macd < macd_signal,
+            'macd_golden_cross': macd > macd_signal and prev['macd'] <= prev['macd_signal'],
+            'macd_death_cross': macd < macd_signal and prev['macd'] >= prev['macd_signal'],
+            'macd_hist_rising': macd_hist > prev['macd_hist'],
+            'macd_hist_falling': macd_hist < prev['macd_hist'],
+            'rsi': rsi,
+            'volume_sma': volume_sma,
+            'volume_ratio': volume_ratio,
+            'ema_fast': ema_fast,
+            'ema_slow': ema_slow,
+            'ema_trend_up': ema_fast > ema_slow
+        })
+        
+        state.last_row = new_row
+        return self._finalize_result(self.generate_signal_from_row(new_row, current_timestamp()))
     
     def generate_signal(self, dataframe: pd.DataFrame) -> AnalysisResult:
         """生成交易信号"""
         
+        now_str = current_timestamp()
+        
         if len(dataframe) == 0:
             return AnalysisResult(
                 signal=Signal.HOLD,
                 confidence=0.0,
                 reasons=["数据不足"],
                 indicators={},
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
-        # 获取最新几行数据用于分析
-        last_row = dataframe.iloc[-1]
-        prev_row = dataframe.iloc[-2] if len(dataframe) > 1 else last_row
+        return self.generate_signal_from_row(get_last_row(dataframe), now_str)
+    
+    def generate_signal_from_row(self, last_row: Dict[str, Any], now_str: str) -> AnalysisResult:
+        """由最新一根K线的 {列名: 值} 字典生成交易信号"""
         
         # 提取关键指标
         indicators = {
@@ -142,7 +219,7 @@ class MACDStrategy(BaseStrategy):
                 confidence=min(confidence, 1.0),
                 reasons=reasons,
                 indicators=indicators,
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # 卖出信号检测
@@ -169,7 +246,7 @@ class MACDStrategy(BaseStrategy):
                 confidence=min(confidence, 1.0),
                 reasons=reasons,
                 indicators=indicators,
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # 持续趋势信号
@@ -181,7 +258,7 @@ class MACDStrategy(BaseStrategy):
                     confidence=0.6,
                     reasons=reasons,
                     indicators=indicators,
-                    timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                    timestamp=now_str
                 )
         
         elif last_row.get('macd_below_signal', False) and not last_row.get('ema_trend_up', True):
@@ -192,7 +269,7 @@ class MACDStrategy(BaseStrategy):
                     confidence=0.6,
                     reasons=reasons,
                     indicators=indicators,
-                    timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                    timestamp=now_str
                 )
         
         # 默认观望
@@ -202,5 +279,5 @@ class MACDStrategy(BaseStrategy):
             confidence=0.5,
             reasons=reasons,
             indicators=indicators,
-            timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+            timestamp=now_str
         )
\ No newline at end of file
@@ -7,9 +7,11 @@ import pandas as pd
 import numpy as np
 from typing import Dict, Any
 from .base_strategy import BaseStrategy, StrategyFactory, Signal, AnalysisResult
+from .base_strategy import IncrementalState, EWMState, RollingWindow
 from .base_strategy import (
-    calculate_sma, calculate_ema, calculate_rsi, 
-    calculate_bollinger_bands, calculate_macd, calculate_atr
+    calculate_sma, precompute_common, shared_ema,
+    calculate_bollinger_bands, calculate_macd, calculate_atr, get_last_row, current_timestamp,
+    append_columns, cached_columns, is_rising, is_falling
 )
 
 @StrategyFactory.register_strategy
@@ -50,104 +52,234 @@ class RSIStrategy(BaseStrategy):
     def calculate_indicators(self, dataframe: pd.DataFrame) -> pd.DataFrame:
         """计算技术指标"""
         
+        # 指标只依赖收盘价和成交量，同一行情重复分析时复用缓存结果
+        key = ('rsi_strategy', self.rsi_period, self.rsi_oversold, self.rsi_overbought,
+               self.ema_fast, self.ema_slow, self.volume_factor)
+        columns = cached_columns(dataframe, key, lambda: self._compute_indicator_columns(dataframe))
+        return self.downcast_indicators(append_columns(dataframe, columns))
+    
+    def _compute_indicator_columns(self, dataframe: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """计算全部指标列，返回 {列名: 数组}"""
+        
+        close = dataframe['close'].to_numpy(dtype=np.float64)
+        
         # RSI
-        dataframe['rsi'] = calculate_rsi(dataframe['close'], self.rsi_period)
+        common = precompute_common(dataframe, self.rsi_period)
+        rsi = common['rsi']
+        columns = {'rsi': rsi}
         
         # RSI区域判断
-        dataframe['rsi_oversold'] = dataframe['rsi'] < self.rsi_oversold
-        dataframe['rsi_overbought'] = dataframe['rsi'] > self.rsi_overbought
-        dataframe['rsi_neutral'] = (dataframe['rsi'] >= self.rsi_oversold) & (dataframe['rsi'] <= self.rsi_overbought)
+        columns['rsi_oversold'] = rsi < self.rsi_oversold
+        columns['rsi_overbought'] = rsi > self.rsi_overbought
+        columns['rsi_neutral'] = (rsi >= self.rsi_oversold) & (rsi <= self.rsi_overbought)
         
         # RSI趋势
-        dataframe['rsi_rising'] = dataframe['rsi'] > dataframe['rsi'].shift(1)
-        dataframe['rsi_falling'] = dataframe['rsi'] < dataframe['rsi'].shift(1)
+        columns['rsi_rising'] = is_rising(rsi)
+        columns['rsi_falling'] = is_falling(rsi)
         
         # RSI背离检测
-        dataframe['price_higher'] = dataframe['close'] > dataframe['close'].shift(5)
-        dataframe['price_lower'] = dataframe['close'] < dataframe['close'].shift(5)
-        dataframe['rsi_higher'] = dataframe['rsi'] > dataframe['rsi'].shift(5)
-        dataframe['rsi_lower'] = dataframe['rsi'] < dataframe['rsi'].shift(5)
+        price_higher = is_rising(close, 5)
+        price_lower = is_falling(close, 5)
+        rsi_higher = is_rising(rsi, 5)
+        rsi_lower = is_falling(rsi, 5)
+        columns['price_higher'] = price_higher
+        columns['price_lower'] = price_lower
+        columns['rsi_higher'] = rsi_higher
+        columns['rsi_lower'] = rsi_lower
         
         # 看涨背离：价格创新低但RSI没有创新低
-        dataframe['bullish_divergence'] = (
-            dataframe['price_lower'] & ~dataframe['rsi_lower']
-        )
+        columns['bullish_divergence'] = price_lower & ~rsi_lower
         
         # 看跌背离：价格创新高但RSI没有创新高
-        dataframe['bearish_divergence'] = (
-            dataframe['price_higher'] & ~dataframe['rsi_higher']
-        )
+        columns['bearish_divergence'] = price_higher & ~rsi_higher
         
         # EMA趋势确认
-        dataframe['ema_fast'] = calculate_ema(dataframe['close'], self.ema_fast)
-        dataframe['ema_slow'] = calculate_ema(dataframe['close'], self.ema_slow)
-        dataframe['ema_trend_up'] = dataframe['ema_fast'] > dataframe['ema_slow']
-        dataframe['price_above_ema'] = dataframe['close'] > dataframe['ema_fast']
+        ema_fast = shared_ema(dataframe['close'], self.ema_fast)
+        ema_slow = shared_ema(dataframe['close'], self.ema_slow)
+        columns['ema_fast'] = ema_fast
+        columns['ema_slow'] = ema_slow
+        columns['ema_trend_up'] = ema_fast > ema_slow
+        columns['price_above_ema'] = close > ema_fast
         
         # 成交量指标
-        dataframe['volume_sma'] = dataframe['volume'].rolling(window=20).mean()
-        dataframe['volume_ratio'] = dataframe['volume'] / dataframe['volume_sma']
-        dataframe['high_volume'] = dataframe['volume_ratio'] > self.volume_factor
+        columns['volume_sma'] = common['volume_sma']
+        columns['volume_ratio'] = common['volume_ratio']
+        columns['high_volume'] = common['volume_ratio'] > self.volume_factor
         
         # MACD辅助
         macd_line, signal_line, histogram = calculate_macd(dataframe['close'])
-        dataframe['macd'] = macd_line
-        dataframe['macd_signal'] = signal_line
-        dataframe['macd_bullish'] = dataframe['macd'] > dataframe['macd_signal']
+        macd = macd_line.to_numpy()
+        macd_signal = signal_line.to_numpy()
+        columns['macd'] = macd
+        columns['macd_signal'] = macd_signal
+        columns['macd_bullish'] = macd > macd_signal
+        
+        return columns
+    
+    def warmup(self, dataframe: pd.DataFrame) -> AnalysisResult:
+        """实时模式初始化：批量计算一次指标，并由末尾K线建立增量状态"""
+        if not self.validate_data(dataframe):
+            self._state = None
+            return super().warmup(dataframe)
+        
+        dataframe = self.calculate_indicators(self.preprocess_data(dataframe.copy()))
+        close = dataframe['close']
+        count = len(dataframe)
+        
+        state = IncrementalState()
+        state.seed_rsi(close, self.rsi_period)
+        state.seed_volume(dataframe['volume'])
+        # 背离检测需要5根之前的收盘价和RSI
+        state.windows['close_lag'] = RollingWindow.from_values(close, 5)
+        state.windows['rsi_lag'] = RollingWindow.from_values(dataframe['rsi'], 5)
+        state.ewms['ema_fast'] = EWMState.from_last(dataframe['ema_fast'].iloc[-1], count, self.ema_fast)
+        state.ewms['ema_slow'] = EWMState.from_last(dataframe['ema_slow'].iloc[-1], count, self.ema_slow)
+        state.ewms['macd_fast'] = EWMState.from_last(shared_ema(close, 12)[-1], count, 12)
+        state.ewms['macd_slow'] = EWMState.from_last(shared_ema(close, 26)[-1], count, 26)
+        state.ewms['macd_signal'] = EWMState.from_last(dataframe['macd_signal'].iloc[-1], count, 9)
+        state.last_row = dataframe.iloc[-1].to_dict()
+        
+        self._state = state
+        self._history = None
+        return self._finalize_result(self.generate_signal(dataframe.iloc[-1:]))
+    
+    def analyze_tick(self, row: Dict[str, Any]) -> AnalysisResult:
+        """实时模式：以滑动窗口和EMA递推更新指标，仅对最后一根K线生成信号"""
+        if self._state is None:
+            return self._analyze_tick_until_warm(row)
+        
+        new_row = self._parse_tick(row)
+        if new_row is None:
+            return self._invalid_tick_result()
+        
+        close = np.float64(new_row['close'])
+        state = self._state
+        windows = state.windows
+        ewms = state.ewms
+        prev = state.last_row
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # RSI
+            rsi = state.push_rsi(close - prev['close'])
+            
+            # 5根之前的收盘价和RSI
+            close_5 = windows['close_lag'].values()[0]
+            rsi_5 = windows['rsi_lag'].values()[0]
+            windows['close_lag'].push(close)
+            windows['rsi_lag'].push(rsi)
+            
+            # EMA趋势确认
+            ema_fast = ewms['ema_fast'].push(close)
+            ema_slow = ewms['ema_slow'].push(close)
+            
+            # 成交量指标
+            volume_sma, volume_ratio = state.push_volume(new_row['volume'])
+            
+            # MACD辅助
+            macd = ewms['macd_fast'].push(close) - ewms['macd_slow'].push(close)
+            macd_signal = ewms['macd_signal'].push(macd)
+        
+        price_higher = close > close_5
+        price_lower = close < close_5
+        rsi_higher = rsi > rsi_5
+        rsi_lower = rsi < rsi_5
         
-        return dataframe
+        new_row.update({
+            'rsi': rsi,
+            'rsi_oversold': rsi < self.rsi_oversold,
+            'rsi_overbought': rsi > self.rsi_overbought,
+            'rsi_neutral': self.rsi_oversold <= rsi <= self.rsi_overbought,
+            'rsi_rising': rsi > prev['rsi'],
+            'rsi_falling': rsi < prev['rsi'],
+            'price_higher': price_higher,
+            'price_lower': price_lower,
+            'rsi_higher': rsi_higher,
+            'rsi_lower': rsi_lower,
+            'bullish_divergence': price_lower and not rsi_lower,
+            'bearish_divergence': price_higher and not rsi_higher,
+            'ema_fast': ema_fast,
+            'ema_slow': ema_slow,
+            'ema_trend_up': ema_fast > ema_slow,
+            'price_above_ema': close > ema_fast,
+            'volume_sma': volume_sma,
+            'volume_ratio': volume_ratio,
+            'high_volume': volume_ratio > self.volume_factor,
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_bullish': macd > macd_signal
+        })
+        
+        state.last_row = new_row
+        return self._finalize_result(self.generate_signal_from_row(new_row, current_timestamp()))
     
     def generate_signal(self, dataframe: pd.DataFrame) -> AnalysisResult:
         """生成交易信号"""
         
+        now_str = current_timestamp()
+        
         if len(dataframe) == 0:
             return AnalysisResult(
                 signal=Signal.HOLD,
                 confidence=0.0,
                 reasons=["数据不足"],
                 indicators={},
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # 获取最新数据
-        last_row = dataframe.iloc[-1]
-        prev_row = dataframe.iloc[-2] if len(dataframe) > 1 else last_row
+        last_row = get_last_row(dataframe)
+        return self.generate_signal_from_row(last_row, now_str)
+    
+    def generate_signal_from_row(self, last_row: Dict[str, Any], now_str: str) -> AnalysisResult:
+        """
+        由最新一根K线的 {列名: 值} 字典生成交易信号
+        所需列均由calculate_indicators/analyze_tick生成，直接按键读取
+        """
+        
+        # RSI未就绪（如停牌导致窗口内无涨跌，或收盘价缺失）时直接观望，不再进入各分支判断
+        if np.isnan(last_row['rsi']):
+            return AnalysisResult(
+                signal=Signal.HOLD,
+                confidence=0.0,
+                reasons=["指标未就绪"],
+                indicators={},
+                timestamp=now_str
+            )
         
         # 提取关键指标
         indicators = {
-            'rsi': float(last_row.get('rsi', 50)),
-            'rsi_prev': float(prev_row.get('rsi', 50)),
-            'close': float(last_row.get('close', 0)),
-            'volume_ratio': float(last_row.get('volume_ratio', 1)),
-            'ema_fast': float(last_row.get('ema_fast', 0)),
-            'ema_slow': float(last_row.get('ema_slow', 0))
+            'rsi': float(last_row['rsi']),
+            'close': float(last_row['close']),
+            'volume_ratio': float(last_row['volume_ratio']),
+            'ema_fast': float(last_row['ema_fast']),
+            'ema_slow': float(last_row['ema_slow'])
         }
         
         reasons = []
         
         # 买入信号检测
-        if last_row.get('rsi_oversold', False):
+        if last_row['rsi_oversold']:
             confidence = 0.7
             reasons.append(f"RSI({indicators['rsi']:.1f})超卖")
             
             # 增强信号条件
-            if last_row.get('rsi_rising', False):
+            if last_row['rsi_rising']:
                 confidence += 0.1
                 reasons.append("RSI开始回升")
             
-            if last_row.get('bullish_divergence', False):
+            if last_row['bullish_divergence']:
                 confidence += 0.15
                 reasons.append("看涨背离")
             
-            if last_row.get('ema_trend_up', False):
+            if last_row['ema_trend_up']:
                 confidence += 0.05
                 reasons.append("主趋势向上")
             
-            if last_row.get('high_volume', False):
+            if last_row['high_volume']:
                 confidence += 0.05
                 reasons.append("成交量放大")
                 
-            if last_row.get('macd_bullish', False):
+            if last_row['macd_bullish']:
                 confidence += 0.05
                 reasons.append("MACD支持")
             
@@ -156,32 +288,32 @@ class RSIStrategy(BaseStrategy):
                 confidence=min(confidence, 1.0),
                 reasons=reasons,
                 indicators=indicators,
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # 卖出信号检测
-        elif last_row.get('rsi_overbought', False):
+        elif last_row['rsi_overbought']:
             confidence = 0.7
             reasons.append(f"RSI({indicators['rsi']:.1f})超买")
             
             # 增强信号条件
-            if last_row.get('rsi_falling', False):
+            if last_row['rsi_falling']:
                 confidence += 0.1
                 reasons.append("RSI开始回落")
             
-            if last_row.get('bearish_divergence', False):
+            if last_row['bearish_divergence']:
                 confidence += 0.15
                 reasons.append("看跌背离")
             
-            if not last_row.get('ema_trend_up', True):
+            if not last_row['ema_trend_up']:
                 confidence += 0.05
                 reasons.append("主趋势向下")
             
-            if last_row.get('high_volume', False):
+            if last_row['high_volume']:
                 confidence += 0.05
                 reasons.append("成交量放大")
                 
-            if not last_row.get('macd_bullish', True):
+            if not last_row['macd_bullish']:
                 confidence += 0.05
                 reasons.append("MACD转弱")
             
@@ -190,30 +322,30 @@ class RSIStrategy(BaseStrategy):
                 confidence=min(confidence, 1.0),
                 reasons=reasons,
                 indicators=indicators,
-                timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                timestamp=now_str
             )
         
         # RSI中性区域的趋势跟随
-        elif indicators['rsi'] > self.rsi_middle and last_row.get('ema_trend_up', False):
-            if last_row.get('price_above_ema', False) and last_row.get('rsi_rising', False):
+        elif indicators['rsi'] > self.rsi_middle and last_row['ema_trend_up']:
+            if last_row['price_above_ema'] and last_row['rsi_rising']:
                 reasons = [f"RSI({indicators['rsi']:.1f})中性偏强", "趋势向上", "价格强势"]
                 return AnalysisResult(
                     signal=Signal.BUY,
                     confidence=0.55,
                     reasons=reasons,
                     indicators=indicators,
-                    timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                    timestamp=now_str
                 )
         
-        elif indicators['rsi'] < self.rsi_middle and not last_row.get('ema_trend_up', True):
-            if not last_row.get('price_above_ema', True) and last_row.get('rsi_falling', False):
+        elif indicators['rsi'] < self.rsi_middle and not last_row['ema_trend_up']:
+            if not last_row['price_above_ema'] and last_row['rsi_falling']:
                 reasons = [f"RSI({indicators['rsi']:.1f})中性偏弱", "趋势向下", "价格疲弱"]
                 return AnalysisResult(
                     signal=Signal.SELL,
                     confidence=0.55,
                     reasons=reasons,
                     indicators=indicators,
-                    timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+                    timestamp=now_str
                 )
         
         # 默认观望
@@ -223,5 +355,5 @@ class RSIStrategy(BaseStrategy):
             confidence=0.5,
             reasons=reasons,
             indicators=indicators,
-            timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+            timestamp=now_str
         )
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+实时模式（warmup + analyze_tick）与批量分析（analyze）的一致性测试
+价格按最小变动单位0.01取值，策略中 > / <= 等比较的等值情况频繁出现，
+增量计算与批量计算的任何舍入差异都会导致信号不同
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategy import StrategyFactory
+from strategy.base_strategy import (
+    NUMBA_AVAILABLE, EWMState, RollingWindow, calculate_ema, calculate_rolling_quantile, calculate_rolling_std,
+    calculate_sma
+)
+
+pytestmark = pytest.mark.skipif(
+    not NUMBA_AVAILABLE, reason="实时模式与批量计算逐位一致依赖numba内核"
+)
+
+LIVE_STRATEGIES = ['BollingerStrategy', 'MACDStrategy', 'MACrossoverStrategy', 'RSIStrategy', 'KDJStrategy']
+
+
+def make_ticks(n: int, seed: int, quantized: bool = True) -> pd.DataFrame:
+    """生成n根K线，quantized为True时价格为0.01的整数倍"""
+    rng = np.random.default_rng(seed)
+    if quantized:
+        close = (1000 + np.cumsum(rng.choice([-2, -1, 0, 0, 1, 2], size=n))).clip(100) / 100.0
+        open_ = np.round(close - rng.choice([-1, 0, 1], size=n) / 100.0, 2)
+        high = np.round(np.maximum(open_, close) + rng.integers(0, 3, size=n) / 100.0, 2)
+        low = np.round(np.minimum(open_, close) - rng.integers(0, 3, size=n) / 100.0, 2)
+    else:
+        close = 10 + rng.normal(0, 0.05, n).cumsum()
+        open_ = close + rng.normal(0, 0.01, n)
+        high = np.maximum(open_, close) + rng.random(n) * 0.02
+        low = np.minimum(open_, close) - rng.random(n) * 0.02
+    volume = rng.integers(1, 50, size=n) * 100.0
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume})
+
+
+def test_rolling_window_matches_batch_helpers():
+    values = make_ticks(5000, 0)['close']
+    window = RollingWindow(20)
+    means = []
+    stds = []
+    for value in values:
+        window.push(value)
+        means.append(window.mean)
+        stds.append(window.std())
+    
+    np.testing.assert_array_equal(np.array(means), calculate_sma(values, 20).to_numpy())
+    np.testing.assert_array_equal(np.array(stds), calculate_rolling_std(values, 20).to_numpy())
+
+
+def test_rolling_window_from_values_matches_batch_helpers():
+    values = make_ticks(3000, 1)['volume']
+    window = RollingWindow.from_values(values, 20)
+    
+    assert window.mean == calculate_sma(values, 20).iloc[-1]
+    assert window.std() == calculate_rolling_std(values, 20).iloc[-1]
+
+
+def test_rolling_window_quantile_matches_batch_helper():
+    values = make_ticks(1000, 3)['close']
+    window = RollingWindow(20)
+    lows = []
+    highs = []
+    for value in values:
+        window.push(value)
+        lows.append(window.quantile(0.2))
+        highs.append(window.quantile(0.8))
+    
+    np.testing.assert_array_equal(np.array(lows), calculate_rolling_quantile(values, 20, 0.2).to_numpy())
+    np.testing.assert_array_equal(np.array(highs), calculate_rolling_quantile(values, 20, 0.8).to_numpy())
+
+
+def test_ewm_state_matches_calculate_ema():
+    values = make_ticks(3000, 2)['close']
+    batch = calculate_ema(values, 26).to_numpy()
+    state = EWMState.from_last(batch[999], 1000, 26)
+    
+    live = [state.push(value) for value in values.iloc[1000:]]
+    
+    np.testing.assert_array_equal(np.array(live), batch[1000:])
+
+
+@pytest.mark.parametrize('quantized', [True, False])
+@pytest.mark.parametrize('strategy_name', LIVE_STRATEGIES)
+def test_analyze_tick_matches_analyze(strategy_name, quantized):
+    warm, ticks = 200, 150
+    for seed in range(2):
+        dataframe = make_ticks(warm + ticks, seed, quantized)
+        live_strategy = StrategyFactory.create_strategy(strategy_name)
+        batch_strategy = StrategyFactory.create_strategy(strategy_name)
+        live_strategy.warmup(dataframe.iloc[:warm])
+        
+        for i in range(warm, warm + ticks):
+            live = live_strategy.analyze_tick(dataframe.iloc[i].to_dict())
+            batch = batch_strategy.analyze(dataframe.iloc[:i + 1].copy())
+            
+            assert live.signal == batch.signal, f"第{i}根K线信号不一致"
+            assert live.reasons == batch.reasons, f"第{i}根K线信号原因不一致"
+            assert live.confidence == batch.confidence, f"第{i}根K线置信度不一致"
+            assert live.indicators == batch.indicators, f"第{i}根K线指标不一致"
@@ -0,0 +1,63 @@
+"""
+滚动指标辅助函数测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategy import StrategyFactory
+from strategy.base_strategy import calculate_atr, calculate_rolling_std, calculate_sma
+
+
+def make_ohlcv(n: int, seed: int = 0) -> pd.DataFrame:
+    """生成n根随机K线"""
+    rng = np.random.default_rng(seed)
+    close = 10 + rng.normal(0, 0.1, n).cumsum()
+    return pd.DataFrame({
+        'open': close,
+        'high': close + 0.05,
+        'low': close - 0.05,
+        'close': close,
+        'volume': rng.integers(100, 900, n) * 1.0
+    })
+
+
+@pytest.mark.parametrize('n', [0, 1, 5, 20])
+def test_sma_and_std_shorter_than_window_are_nan(n):
+    """数据量不足一个窗口时与pandas一致返回全NaN，而不是抛出异常"""
+    data = make_ohlcv(n)['close']
+    
+    sma = calculate_sma(data, 21)
+    std = calculate_rolling_std(data, 21)
+    
+    assert len(sma) == n and sma.isna().all()
+    assert len(std) == n and std.isna().all()
+
+
+@pytest.mark.parametrize('n', [0, 1, 5])
+def test_atr_shorter_than_window_is_nan(n):
+    """ATR在空序列和数据不足一个窗口时返回全NaN"""
+    data = make_ohlcv(n)
+    
+    atr = calculate_atr(data['high'], data['low'], data['close'], 14)
+    
+    assert len(atr) == n and atr.isna().all()
+    assert atr.index.equals(data.index)
+
+
+def test_sma_and_std_match_pandas():
+    data = make_ohlcv(200)['close']
+    
+    np.testing.assert_allclose(calculate_sma(data, 20), data.rolling(20).mean(), rtol=1e-12)
+    np.testing.assert_allclose(calculate_rolling_std(data, 20), data.rolling(20).std(), rtol=1e-9)
+
+
+@pytest.mark.parametrize('strategy_name', StrategyFactory.get_available_strategies())
+def test_calculate_indicators_with_short_history(strategy_name):
+    """图表直接调用calculate_indicators，历史K线少于指标窗口时也应能计算"""
+    dataframe = make_ohlcv(10)
+    
+    result = StrategyFactory.create_strategy(strategy_name).calculate_indicators(dataframe.copy())
+    
+    assert len(result) == 10
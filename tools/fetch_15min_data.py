@@ -10,8 +10,21 @@ import sys
 import os
 import time
 import argparse
+import queue
+import threading
 from datetime import datetime, timedelta
 
+try:
+    from tqdm import tqdm
+except ImportError:  # tqdm为可选依赖，缺失时逐只股票打印进度
+    tqdm = None
+
+try:
+    import pyarrow  # noqa: F401  pandas读写Parquet的引擎
+    PARQUET_AVAILABLE = True
+except ImportError:  # pyarrow为可选依赖，仅导出Parquet时需要
+    PARQUET_AVAILABLE = False
+
 # 添加路径以便导入模块
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
@@ -20,8 +33,10 @@ sys.path.append(parent_dir)
 from core.db_utils import DatabaseUtils
 
 class DataFetcher:
-    def __init__(self):
+    def __init__(self, parquet_dir=None):
         self.conn, self.cursor = DatabaseUtils.connect_to_mysql()
+        # 指定时同时按 ts_code/year/month 分区导出Parquet，供回测等分析场景直接读取
+        self.parquet_dir = parquet_dir
         
     def __enter__(self):
         return self
@@ -38,19 +53,12 @@ class DataFetcher:
         """
         try:
             print("正在清空stock_15min_history表...")
-            self.cursor.execute("DELETE FROM stock_15min_history")
+            # TRUNCATE直接重建表空间，不逐行删除；执行成功即表已为空，无需再COUNT确认
+            self.cursor.execute("TRUNCATE TABLE stock_15min_history")
             self.conn.commit()
             
-            # 获取清空后的记录数确认
-            self.cursor.execute("SELECT COUNT(*) FROM stock_15min_history")
-            count = self.cursor.fetchone()[0]
-            
-            if count == 0:
-                print("✓ 成功清空stock_15min_history表")
-                return True
-            else:
-                print(f"✗ 表清空可能不完整，仍有{count}条记录")
-                return False
+            print("✓ 成功清空stock_15min_history表")
+            return True
                 
         except Exception as e:
             print(f"✗ 清空表失败: {e}")
@@ -86,27 +94,24 @@ class DataFetcher:
             
             # 获取全部A股列表
             rs = bs.query_all_stock(day='2025-08-01')  # 使用一个已知日期
-            stock_list = []
+            codes = []
             
             while (rs.error_code == '0') & rs.next():
-                stock_data = rs.get_row_data()
-                code = stock_data[0]  # baostock格式：sh.600000, sz.000001
-                
-                # 转换为tushare格式用于显示
-                if code.startswith('sh.'):
-                    ts_code = code.replace('sh.', '') + '.SH'
-                elif code.startswith('sz.'):
-                    ts_code = code.replace('sz.', '') + '.SZ'
-                else:
-                    continue
-                
-                stock_list.append(ts_code)
+                codes.append(rs.get_row_data()[0])  # baostock格式：sh.600000, sz.000001
+            
+            # 整列转换为tushare格式用于显示，非沪深代码丢弃
+            codes = pd.Series(codes, dtype=object)
+            exchange = codes.str[:3].map({'sh.': '.SH', 'sz.': '.SZ'})
+            valid = exchange.notna()
+            ts_codes = codes[valid].str[3:] + exchange[valid]
             
             # 限制数量并返回
-            if limit and len(stock_list) > limit:
-                stock_list = stock_list[:limit]
-                
-            print(f"获取到 {len(stock_list)} 只股票（上海：{len([s for s in stock_list if s.endswith('.SH')])}，深圳：{len([s for s in stock_list if s.endswith('.SZ')])}）")
+            if limit and len(ts_codes) > limit:
+                ts_codes = ts_codes.iloc[:limit]
+            
+            stock_list = ts_codes.tolist()
+            sh_count = int(ts_codes.str.endswith('.SH').sum())
+            print(f"获取到 {len(stock_list)} 只股票（上海：{sh_count}，深圳：{len(stock_list) - sh_count}）")
             return stock_list
             
         except Exception as e:
@@ -174,108 +179,190 @@ class DataFetcher:
             print(f"获取股票 {stock_code} 数据失败: {e}")
             return pd.DataFrame()
     
-    def save_to_database(self, df, stock_code):
+    def prepare_bars(self, df, stock_code):
         """
-        将数据保存到数据库
+        将baostock返回的原始数据整理为入库格式
+        Returns:
+            包含 ts_code/timestamp/open/high/low/close/volume/amount 的DataFrame，无有效数据时为空
         """
         if df.empty:
-            return 0
+            return pd.DataFrame()
             
-        saved_count = 0
-        for index, row in df.iterrows():
-            try:
-                # 解析时间字符串
-                time_str = str(row['time'])[:14]
-                if len(time_str) < 14:
-                    continue
-                    
-                year = time_str[:4]
-                month = time_str[4:6]
-                day = time_str[6:8]
-                hour = time_str[8:10]
-                minute = time_str[10:12]
-                second = time_str[12:14]
-                
-                datetime_str = f"{year}-{month}-{day} {hour}:{minute}:{second}"
-                timestamp = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S')
-                
-                self.cursor.execute('''
-                    INSERT IGNORE INTO stock_15min_history 
-                    (ts_code, timestamp, open, high, low, close, volume, amount)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ''', (
-                    stock_code, timestamp, 
-                    float(row['open']) if row['open'] else 0,
-                    float(row['high']) if row['high'] else 0,
-                    float(row['low']) if row['low'] else 0,
-                    float(row['close']) if row['close'] else 0,
-                    int(row['volume']) if row['volume'] else 0,
-                    float(row['amount']) if row['amount'] else 0
-                ))
-                saved_count += 1
-                
-            except Exception as e:
-                print(f"保存数据行失败: {e}")
-                continue
+        # 向量化解析时间字符串（YYYYMMDDHHMMSS），长度不足或格式错误的行为NaT
+        timestamps = pd.to_datetime(
+            df['time'].astype(str).str.slice(0, 14), format='%Y%m%d%H%M%S', errors='coerce'
+        )
+        
+        # 数值列统一转换：空值按0保存，无法解析的数值所在行跳过
+        value_cols = ['open', 'high', 'low', 'close', 'volume', 'amount']
+        raw = df[value_cols]
+        values = raw.apply(pd.to_numeric, errors='coerce')
+        missing = raw.isna() | (raw == '')
+        invalid = (values.isna() & ~missing).any(axis=1)
+        values = values.mask(missing, 0)
+        if invalid.any():
+            print(f"跳过{int(invalid.sum())}条无法解析的数据行")
+        
+        valid = timestamps.notna() & ~invalid
+        if not valid.any():
+            return pd.DataFrame()
+        
+        bars = values[valid].astype(float)
+        bars['volume'] = bars['volume'].astype('int64')
+        bars.insert(0, 'timestamp', timestamps[valid])
+        bars.insert(0, 'ts_code', stock_code)
+        return bars.reset_index(drop=True)
+    
+    def save_to_database(self, bars, stock_code):
+        """
+        将prepare_bars整理后的数据保存到数据库
+        """
+        if bars.empty:
+            return 0
+        
+        # 转为Python原生类型，保证pymysql按数值和日期时间转义
+        rows = list(zip(
+            [stock_code] * len(bars),
+            bars['timestamp'].dt.to_pydatetime().tolist(),
+            bars['open'].tolist(),
+            bars['high'].tolist(),
+            bars['low'].tolist(),
+            bars['close'].tolist(),
+            bars['volume'].tolist(),
+            bars['amount'].tolist()
+        ))
+        
+        # executemany会将 INSERT ... VALUES 合并为多行插入语句，避免逐行往返数据库
+        # rowcount为各语句实际插入行数之和（INSERT IGNORE忽略的重复行不计入）
+        try:
+            self.cursor.executemany('''
+                INSERT IGNORE INTO stock_15min_history 
+                (ts_code, timestamp, open, high, low, close, volume, amount)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ''', rows)
+            saved_count = self.cursor.rowcount
+            self.conn.commit()
+        except Exception as e:
+            print(f"批量保存数据失败: {e}")
+            self.conn.rollback()
+            return 0
         
-        self.conn.commit()
         return saved_count
     
+    def save_to_parquet(self, bars):
+        """
+        将prepare_bars整理后的数据按 ts_code/year/month 分区写入Parquet
+        重新拉取时覆盖对应分区，读取时可用 pd.read_parquet(path, filters=[('ts_code', '=', code)]) 只读单只股票
+        """
+        if bars.empty:
+            return
+        
+        bars = bars.assign(year=bars['timestamp'].dt.year, month=bars['timestamp'].dt.month)
+        bars.to_parquet(
+            self.parquet_dir,
+            engine='pyarrow',
+            index=False,
+            partition_cols=['ts_code', 'year', 'month'],
+            existing_data_behavior='delete_matching'
+        )
+    
+    def _save_worker(self, save_queue, save_result):
+        """
+        数据库写入线程：依次保存队列中的数据，收到None时结束
+        """
+        while True:
+            item = save_queue.get()
+            if item is None:
+                break
+            stock_code, df = item
+            try:
+                bars = self.prepare_bars(df, stock_code)
+                save_result['saved'] += self.save_to_database(bars, stock_code)
+                if self.parquet_dir:
+                    self.save_to_parquet(bars)
+            except Exception as e:
+                print(f"保存股票 {stock_code} 数据失败: {e}")
+    
     def fetch_data_batch(self, stock_list, start_date, end_date, batch_size=10):
         """
         批量获取股票数据
+        baostock使用全局会话不能并发查询，因此在当前线程顺序拉取；
+        数据库写入交给独立线程，拉取下一只股票的同时写入上一只
         """
         total_processed = 0
-        total_saved = 0
         total_stocks = len(stock_list)
         start_time = datetime.now()
         
-        for i in range(0, len(stock_list), batch_size):
-            batch_stocks = stock_list[i:i + batch_size]
-            batch_num = i//batch_size + 1
-            total_batches = (len(stock_list)-1)//batch_size + 1
-            
-            print(f"📦 批次 {batch_num}/{total_batches} ({len(batch_stocks)}只股票)")
-            print("-" * 40)
-            
-            for stock_code in batch_stocks:
-                # 转换股票代码格式用于baostock查询
-                bs_code = self.convert_tushare_to_baostock_code(stock_code)
-                
-                print(f"  📈 {stock_code} ({bs_code}) ... ", end="")
-                
-                # 获取数据
-                df = self.get_15min_stock_data(stock_code, start_date, end_date)
+        # MySQL连接在拉取期间只由写入线程使用
+        save_queue = queue.Queue(maxsize=batch_size * 2)
+        save_result = {'saved': 0}
+        writer = threading.Thread(target=self._save_worker, args=(save_queue, save_result), daemon=True)
+        writer.start()
+        
+        # 有tqdm时只显示按固定频率刷新的进度条，不再逐只股票打印
+        progress_bar = tqdm(total=total_stocks, desc='拉取进度', unit='只') if tqdm else None
+        
+        try:
+            for i in range(0, len(stock_list), batch_size):
+                batch_stocks = stock_list[i:i + batch_size]
+                batch_num = i//batch_size + 1
+                total_batches = (len(stock_list)-1)//batch_size + 1
                 
-                if not df.empty:
-                    # 保存到数据库
-                    saved_count = self.save_to_database(df, stock_code)
-                    total_saved += saved_count
-                    print(f"✓ 保存{saved_count}条")
-                else:
-                    print("❌ 无数据")
+                if progress_bar is None:
+                    print(f"📦 批次 {batch_num}/{total_batches} ({len(batch_stocks)}只股票)")
+                    print("-" * 40)
                 
-                total_processed += 1
+                for stock_code in batch_stocks:
+                    # 获取数据
+                    df = self.get_15min_stock_data(stock_code, start_date, end_date)
+                    
+                    if not df.empty:
+                        # 交给写入线程保存到数据库
+                        save_queue.put((stock_code, df))
+                    
+                    total_processed += 1
+                    
+                    if progress_bar is not None:
+                        progress_bar.update(1)
+                        progress_bar.set_postfix(saved=save_result['saved'], refresh=False)
+                        continue
+                    
+                    # 转换股票代码格式用于显示
+                    bs_code = self.convert_tushare_to_baostock_code(stock_code)
+                    if not df.empty:
+                        print(f"  📈 {stock_code} ({bs_code}) ... ✓ 获取{len(df)}条")
+                    else:
+                        print(f"  📈 {stock_code} ({bs_code}) ... ❌ 无数据")
+                    
+                    # 显示总体进度
+                    progress = (total_processed / total_stocks) * 100
+                    elapsed = (datetime.now() - start_time).total_seconds()
+                    if total_processed > 0:
+                        avg_time_per_stock = elapsed / total_processed
+                        estimated_total = avg_time_per_stock * total_stocks
+                        remaining = estimated_total - elapsed
+                        print(f"    进度: {total_processed}/{total_stocks} ({progress:.1f}%) "
+                              f"预计剩余: {remaining/60:.1f}分钟")
+                    
+                    # 避免请求过于频繁
+                    # time.sleep(0.2)
                 
-                # 显示总体进度
-                progress = (total_processed / total_stocks) * 100
-                elapsed = (datetime.now() - start_time).total_seconds()
-                if total_processed > 0:
-                    avg_time_per_stock = elapsed / total_processed
-                    estimated_total = avg_time_per_stock * total_stocks
-                    remaining = estimated_total - elapsed
-                    print(f"    进度: {total_processed}/{total_stocks} ({progress:.1f}%) "
-                          f"预计剩余: {remaining/60:.1f}分钟")
+                # 批次间休息
+                if i + batch_size < len(stock_list):
+                    if progress_bar is None:
+                        print(f"  ⏸️  批次间休息2秒...")
+                    # time.sleep(2)
                 
-                # 避免请求过于频繁
-                # time.sleep(0.2)
-            
-            # 批次间休息
-            if i + batch_size < len(stock_list):
-                print(f"  ⏸️  批次间休息2秒...")
-                # time.sleep(2)
-            
-            print()
+                if progress_bar is None:
+                    print()
+        finally:
+            # 通知写入线程结束，并等待队列中剩余数据写完
+            save_queue.put(None)
+            writer.join()
+            if progress_bar is not None:
+                progress_bar.close()
+        
+        total_saved = save_result['saved']
         
         # 最终统计
         end_time = datetime.now()
@@ -313,6 +400,8 @@ def main():
                        help='拉取前清空stock_15min_history表')
     parser.add_argument('--skip-clear', action='store_true',
                        help='跳过清空表（默认会清空）')
+    parser.add_argument('--parquet-dir', type=str, default=None,
+                       help='同时导出Parquet的目录（按ts_code/year/month分区，需要pyarrow）')
     
     args = parser.parse_args()
     
@@ -324,6 +413,10 @@ def main():
         print("日期格式错误，请使用 YYYY-MM-DD 格式")
         return
     
+    if args.parquet_dir and not PARQUET_AVAILABLE:
+        print("导出Parquet需要安装pyarrow")
+        return
+    
     # 登录baostock
     try:
         lg = bs.login()
@@ -335,7 +428,7 @@ def main():
         return
     
     try:
-        with DataFetcher() as fetcher:
+        with DataFetcher(args.parquet_dir) as fetcher:
             # 清空表（默认行为，除非用户指定跳过）
             if not args.skip_clear:
                 print("=" * 60)
@@ -3,10 +3,12 @@
 股票图表展示功能
 """
 
-from .chart_plotter import ChartPlotter, show_chart_in_browser, save_chart_as_image
+from .chart_plotter import ChartPlotter, show_chart_in_browser, save_chart_as_html, save_chart_as_image, save_charts_as_images
 
 __all__ = [
     'ChartPlotter',
     'show_chart_in_browser',
-    'save_chart_as_image'
+    'save_chart_as_html',
+    'save_chart_as_image',
+    'save_charts_as_images'
 ]
\ No newline at end of file
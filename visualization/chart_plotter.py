@@ -4,19 +4,35 @@
 """
 
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+import gzip
 import sys
 import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 
+# 图表序列化默认使用orjson（可选依赖），to_html/to_json/show均受益
+try:
+    import orjson  # noqa: F401
+    pio.json.config.default_engine = 'orjson'
+except ImportError:
+    pass
+
 # 添加项目路径
+# analyzer/strategy在完整分析流程中才按需导入（见session()），仅绘制或展示已有图表时不加载数据库和策略模块
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from analyzer import StockAnalyzer
-from database import AnalysisDatabase
-from strategy import StrategyFactory
+
+# 完整分析图表的进程级缓存：键为(股票代码, 策略列表, 天数, 行情内容哈希)
+# ChartPlotter在各调用处按次创建，缓存放在模块级才能跨请求复用
+_FIGURE_CACHE = OrderedDict()
+_FIGURE_CACHE_SIZE = 64
+_FIGURE_CACHE_LOCK = threading.Lock()
 
 class ChartPlotter:
     """股票图表绘制器"""
@@ -41,6 +57,32 @@ class ChartPlotter:
             'di_plus': '#ff0000',      # DI+红色
             'di_minus': '#0000ff'      # DI-蓝色
         }
+        # 指标折线最多绘制的点数，超过时按MinMax降采样（K线和柱状图保持完整）
+        self.max_line_points = 2000
+        # 数据量超过该值时指标折线改用WebGL渲染（Scattergl），少量数据仍用SVG
+        self.webgl_min_points = 1000
+        # session()期间复用的StockAnalyzer（数据库连接）
+        self._analyzer = None
+    
+    @contextmanager
+    def session(self):
+        """
+        复用同一个StockAnalyzer（数据库连接）绘制多张图表
+        用法: with plotter.session(): plotter.create_stock_analysis_chart(...) 多次调用
+        未处于session中时，各绘图方法按次打开并关闭连接；嵌套调用直接复用外层连接
+        """
+        if self._analyzer is not None:
+            yield self._analyzer
+            return
+        
+        from analyzer import StockAnalyzer
+        
+        with StockAnalyzer() as analyzer:
+            self._analyzer = analyzer
+            try:
+                yield analyzer
+            finally:
+                self._analyzer = None
     
     def create_kline_chart(self, df: pd.DataFrame, ts_code: str,
                           analysis_results: Optional[Dict] = None,
@@ -61,21 +103,20 @@ class ChartPlotter:
         if df.empty:
             return self._create_empty_chart("无数据", width, height)
         
-        # 计算子图数量
-        subplot_count = 1  # K线图
-        if show_volume:
-            subplot_count += 1
-        if show_indicators:
-            subplot_count += 2  # RSI和MACD
-        
-        # 创建子图
-        specs = [[{"secondary_y": False}] for _ in range(subplot_count)]
+        # 子图行号分配：K线图固定第1行，成交量、RSI、MACD依次向下排列
+        rows = {'kline': 1}
         subplot_titles = [f"{ts_code} K线图"]
-        
         if show_volume:
+            rows['volume'] = len(rows) + 1
             subplot_titles.append("成交量")
         if show_indicators:
+            rows['rsi'] = len(rows) + 1
+            rows['macd'] = len(rows) + 1
             subplot_titles.extend(["RSI", "MACD"])
+        subplot_count = len(rows)
+        
+        # 创建子图
+        specs = [[{"secondary_y": False}] for _ in range(subplot_count)]
         
         # 优化子图高度分配
         if subplot_count == 1:
@@ -92,35 +133,29 @@ class ChartPlotter:
             specs=specs,
             subplot_titles=subplot_titles,
             vertical_spacing=0.08,  # 增加子图间距
-            row_heights=row_heights
+            row_heights=row_heights,
+            shared_xaxes=True  # 各子图x轴联动缩放，且只在最底部子图显示x轴标签
         )
-        
         # 添加K线图
-        self._add_candlestick(fig, df, row=1)
+        self._add_candlestick(fig, df, row=rows['kline'])
         
         # 添加交易信号标记
         if analysis_results:
-            self._add_signal_markers(fig, df, analysis_results, row=1)
+            self._add_signal_markers(fig, df, analysis_results, row=rows['kline'])
         
         # 添加技术指标到K线图
         if show_indicators:
-            self._add_moving_averages(fig, df, row=1)
-            self._add_bollinger_bands(fig, df, row=1)
+            self._add_moving_averages(fig, df, row=rows['kline'])
+            self._add_bollinger_bands(fig, df, row=rows['kline'])
         
         # 添加成交量图
         if show_volume:
-            volume_row = 2
-            self._add_volume(fig, df, row=volume_row)
-        else:
-            volume_row = 1
+            self._add_volume(fig, df, row=rows['volume'])
         
         # 添加技术指标子图
         if show_indicators:
-            rsi_row = volume_row + 1 if show_volume else 2
-            macd_row = rsi_row + 1
-            
-            self._add_rsi(fig, df, row=rsi_row)
-            self._add_macd(fig, df, row=macd_row)
+            self._add_rsi(fig, df, row=rows['rsi'])
+            self._add_macd(fig, df, row=rows['macd'])
         
         # 设置布局
         fig.update_layout(
@@ -140,37 +175,41 @@ class ChartPlotter:
         if total_points > 50:
             # 如果数据点多，只显示部分标签
             step = max(1, total_points // 20)  # 最多显示20个标签
-            tickvals = list(range(0, total_points, step))
-            ticktext = [df.index[i] if i < len(df.index) else '' for i in tickvals]
         else:
             step = max(1, total_points // 10)  # 较少数据时显示10个标签
-            tickvals = list(range(0, total_points, step))
-            ticktext = [df.index[i] if i < len(df.index) else '' for i in tickvals]
+        tickvals = list(range(0, total_points, step))
+        ticktext = df.index[tickvals].tolist()  # tickvals均在索引范围内，直接按位置取标签
         
-        # 计算子图总数
-        total_subplots = 1  # K线图
-        if show_volume:
-            total_subplots += 1
-        if show_indicators:
-            total_subplots += 2  # RSI和MACD
-        
-        # 更新所有子图的x轴
-        for i in range(1, total_subplots + 1):
-            fig.update_xaxes(
-                type='category',
-                tickmode='array',
-                tickvals=tickvals,
-                ticktext=ticktext,
-                tickangle=45,  # 倾斜45度显示
-                row=i, col=1
-            )
-            
-            # 只在最底部的子图显示x轴标签
-            if i < total_subplots:
-                fig.update_xaxes(showticklabels=False, row=i, col=1)
+        # 一次更新所有子图的x轴，刻度位置保持一致以对齐网格线
+        fig.update_xaxes(
+            type='category',
+            tickmode='array',
+            tickvals=tickvals,
+            ticktext=ticktext,
+            tickangle=45  # 倾斜45度显示
+        )
         
         return fig
     
+    def _line_positions(self, df: pd.DataFrame, columns: List[str]):
+        """
+        指标折线的取样位置
+        数据量不超过max_line_points时返回全部位置；否则对每列做MinMax降采样，
+        返回各列取样位置的并集，同组折线（如布林带上中下轨）共用同一组x
+        """
+        n = len(df)
+        if n <= self.max_line_points:
+            return slice(None)
+        
+        positions = [np.array([0, n - 1])]
+        for col in columns:
+            positions.append(_minmax_positions(df[col].to_numpy(dtype=np.float64), self.max_line_points))
+        return np.unique(np.concatenate(positions))
+    
+    def _line_trace(self, df: pd.DataFrame):
+        """指标折线的轨迹类型：长序列使用WebGL渲染的Scattergl，避免大量SVG节点拖慢浏览器"""
+        return go.Scattergl if len(df) > self.webgl_min_points else go.Scatter
+    
     def _add_candlestick(self, fig: go.Figure, df: pd.DataFrame, row: int):
         """添加K线图"""
         fig.add_trace(
@@ -219,7 +258,7 @@ class ChartPlotter:
                 confidence = result['analysis_result']['confidence']
                 signal_groups[signal].append((strategy_name, confidence))
         
-        # 为每个信号组创建标记
+        # 为每个信号组创建标记：同一信号的所有策略合并为一条散点轨迹
         for signal, strategies in signal_groups.items():
             if not strategies:
                 continue
@@ -233,38 +272,41 @@ class ChartPlotter:
                 y_offset = last_price  # 中间
             
             # 水平偏移，如果同一信号有多个策略
-            for i, (strategy_name, confidence) in enumerate(strategies):
-                x_offset = last_idx + (i - len(strategies)/2 + 0.5) * 0.3
-                
-                fig.add_trace(
-                    go.Scatter(
-                        x=[x_offset],
-                        y=[y_offset],
-                        mode='markers',
-                        marker=dict(
-                            symbol=signal_symbols.get(signal, 'circle'),
-                            color=signal_colors.get(signal, '#888888'),
-                            size=12 + confidence * 8,  # 根据置信度调整大小
-                            line=dict(width=2, color='white'),
-                            opacity=0.8
-                        ),
-                        name=f'{strategy_name}: {signal}',
-                        hovertemplate=f'<b>{strategy_name}</b><br>' +
-                                    f'信号: {signal}<br>' +
-                                    f'置信度: {confidence:.1%}<br>' +
-                                    '<extra></extra>',
-                        showlegend=True
+            count = len(strategies)
+            confidences = np.array([confidence for _, confidence in strategies])
+            x_offsets = last_idx + (np.arange(count) - count/2 + 0.5) * 0.3
+            hover_texts = [f'<b>{strategy_name}</b><br>信号: {signal}<br>置信度: {confidence:.1%}<br>'
+                           for strategy_name, confidence in strategies]
+            
+            fig.add_trace(
+                go.Scatter(
+                    x=x_offsets,
+                    y=np.full(count, y_offset),
+                    mode='markers',
+                    marker=dict(
+                        symbol=signal_symbols.get(signal, 'circle'),
+                        color=signal_colors.get(signal, '#888888'),
+                        size=12 + confidences * 8,  # 根据置信度调整大小
+                        line=dict(width=2, color='white'),
+                        opacity=0.8
                     ),
-                    row=row, col=1
-                )
+                    name=f'{signal}: ' + '、'.join(strategy_name for strategy_name, _ in strategies),
+                    customdata=hover_texts,
+                    hovertemplate='%{customdata}<extra></extra>',
+                    showlegend=True
+                ),
+                row=row, col=1
+            )
     
     def _add_moving_averages(self, fig: go.Figure, df: pd.DataFrame, row: int):
         """添加移动平均线"""
+        line_trace = self._line_trace(df)
         if 'ema_fast' in df.columns:
+            pos = self._line_positions(df, ['ema_fast'])
             fig.add_trace(
-                go.Scatter(
-                    x=df.index,
-                    y=df['ema_fast'],
+                line_trace(
+                    x=df.index[pos],
+                    y=df['ema_fast'].to_numpy()[pos],
                     line=dict(color=self.colors['ma_fast'], width=1),
                     name='EMA12',
                     opacity=0.7
@@ -273,10 +315,11 @@ class ChartPlotter:
             )
         
         if 'ema_slow' in df.columns:
+            pos = self._line_positions(df, ['ema_slow'])
             fig.add_trace(
-                go.Scatter(
-                    x=df.index,
-                    y=df['ema_slow'],
+                line_trace(
+                    x=df.index[pos],
+                    y=df['ema_slow'].to_numpy()[pos],
                     line=dict(color=self.colors['ma_slow'], width=1),
                     name='EMA30',
                     opacity=0.7
@@ -286,12 +329,17 @@ class ChartPlotter:
     
     def _add_bollinger_bands(self, fig: go.Figure, df: pd.DataFrame, row: int):
         """添加布林带"""
+        line_trace = self._line_trace(df)
         if all(col in df.columns for col in ['bb_upper', 'bb_middle', 'bb_lower']):
+            # 三条轨道共用取样位置，保证下轨到中轨的填充区域对齐
+            pos = self._line_positions(df, ['bb_upper', 'bb_middle', 'bb_lower'])
+            x = df.index[pos]
+            
             # 上轨
             fig.add_trace(
-                go.Scatter(
-                    x=df.index,
-                    y=df['bb_upper'],
+                line_trace(
+                    x=x,
+                    y=df['bb_upper'].to_numpy()[pos],
                     line=dict(color=self.colors['bb_upper'], width=1, dash='dash'),
                     name='布林上轨',
                     opacity=0.5
@@ -301,9 +349,9 @@ class ChartPlotter:
             
             # 中轨
             fig.add_trace(
-                go.Scatter(
-                    x=df.index,
-                    y=df['bb_middle'],
+                line_trace(
+                    x=x,
+                    y=df['bb_middle'].to_numpy()[pos],
                     line=dict(color=self.colors['bb_middle'], width=1),
                     name='布林中轨',
                     opacity=0.5
@@ -313,9 +361,9 @@ class ChartPlotter:
             
             # 下轨和填充
             fig.add_trace(
-                go.Scatter(
-                    x=df.index,
-                    y=df['bb_lower'],
+                line_trace(
+                    x=x,
+                    y=df['bb_lower'].to_numpy()[pos],
                     fill='tonexty',
                     fillcolor='rgba(128,128,128,0.1)',
                     line=dict(color=self.colors['bb_lower'], width=1, dash='dash'),
@@ -327,8 +375,9 @@ class ChartPlotter:
     
     def _add_volume(self, fig: go.Figure, df: pd.DataFrame, row: int):
         """添加成交量"""
-        colors = [self.colors['up'] if df.iloc[i]['close'] >= df.iloc[i]['open']
-                 else self.colors['down'] for i in range(len(df))]
+        # 整列比较收盘价与开盘价，避免逐行iloc取值
+        up = df['close'].to_numpy() >= df['open'].to_numpy()
+        colors = np.where(up, self.colors['up'], self.colors['down'])
         
         fig.add_trace(
             go.Bar(
@@ -346,11 +395,13 @@ class ChartPlotter:
     
     def _add_rsi(self, fig: go.Figure, df: pd.DataFrame, row: int):
         """添加RSI指标"""
+        line_trace = self._line_trace(df)
         if 'rsi' in df.columns:
+            pos = self._line_positions(df, ['rsi'])
             fig.add_trace(
-                go.Scatter(
-                    x=df.index,
-                    y=df['rsi'],
+                line_trace(
+                    x=df.index[pos],
+                    y=df['rsi'].to_numpy()[pos],
                     line=dict(color=self.colors['rsi'], width=2),
                     name='RSI',
                     showlegend=False
@@ -370,12 +421,16 @@ class ChartPlotter:
     
     def _add_macd(self, fig: go.Figure, df: pd.DataFrame, row: int):
         """添加MACD指标"""
+        line_trace = self._line_trace(df)
         if all(col in df.columns for col in ['macd', 'macd_signal', 'macd_hist']):
+            # MACD线与信号线共用取样位置，交叉点保持一致
+            pos = self._line_positions(df, ['macd', 'macd_signal'])
+            
             # MACD线
             fig.add_trace(
-                go.Scatter(
-                    x=df.index,
-                    y=df['macd'],
+                line_trace(
+                    x=df.index[pos],
+                    y=df['macd'].to_numpy()[pos],
                     line=dict(color=self.colors['macd'], width=2),
                     name='MACD',
                     showlegend=False
@@ -385,9 +440,9 @@ class ChartPlotter:
             
             # 信号线
             fig.add_trace(
-                go.Scatter(
-                    x=df.index,
-                    y=df['macd_signal'],
+                line_trace(
+                    x=df.index[pos],
+                    y=df['macd_signal'].to_numpy()[pos],
                     line=dict(color=self.colors['macd_signal'], width=2),
                     name='MACD信号',
                     showlegend=False
@@ -395,8 +450,8 @@ class ChartPlotter:
                 row=row, col=1
             )
             
-            # 柱状图
-            colors = ['red' if x < 0 else 'green' for x in df['macd_hist']]
+            # 柱状图（整列判断正负，NaN按非负处理）
+            colors = np.where(df['macd_hist'].to_numpy() < 0, 'red', 'green')
             fig.add_trace(
                 go.Bar(
                     x=df.index,
@@ -433,29 +488,46 @@ class ChartPlotter:
         return fig
     
     def create_stock_analysis_chart(self, ts_code: str, strategy_names: Optional[List[str]] = None,
-                                  days: int = 30, save_path: Optional[str] = None) -> go.Figure:
+                                  days: int = 30, save_path: Optional[str] = None,
+                                  include_plotlyjs: Union[bool, str] = True) -> go.Figure:
         """
         创建股票分析图表（完整流程）
+        include_plotlyjs: 保存HTML时传给save_chart_as_html，默认内嵌plotly.js，'cdn'时从CDN加载
         """
+        from strategy import StrategyFactory
+        
         if strategy_names is None:
             strategy_names = ['ADXTrendStrategy']
         
         try:
             # 获取股票数据
-            with StockAnalyzer() as analyzer:
+            with self.session() as analyzer:
                 df = analyzer.get_stock_data(ts_code, days)
                 
                 if df.empty:
                     return self._create_empty_chart(f"股票 {ts_code} 无数据", 1200, 1000)
                 
+                # 行情未变化时直接返回缓存图表的副本，跳过指标计算和图表构建
+                cache_key = (ts_code, tuple(strategy_names), days,
+                             len(df), hash(pd.util.hash_pandas_object(df).to_numpy().tobytes()))
+                fig = _get_cached_figure(cache_key)
+                if fig is not None:
+                    if save_path:
+                        save_chart_as_html(fig, save_path, include_plotlyjs)
+                    return fig
+                
                 # 运行策略分析
                 analysis_results = {}
-                final_df = df.copy()  # 保存最终用于图表的数据框
+                # 各策略新增的指标列，循环结束后一次性拼接，避免逐列插入
+                base_columns = ['timestamp', 'ts_code', 'open', 'high', 'low', 'close', 'volume', 'amount']
+                known_columns = set(df.columns).union(base_columns)
+                indicator_frames = []
                 
                 for strategy_name in strategy_names:
                     try:
                         strategy = StrategyFactory.create_strategy(strategy_name)
-                        df_with_indicators = strategy.calculate_indicators(df.copy())
+                        # 策略只追加指标列、不改写行情列，浅拷贝即可隔离各策略新增的列
+                        df_with_indicators = strategy.calculate_indicators(df.copy(deep=False))
                         analysis_result = strategy.generate_signal(df_with_indicators)
                         
                         analysis_results[strategy_name] = {
@@ -468,10 +540,11 @@ class ChartPlotter:
                             }
                         }
                         
-                        # 合并指标到最终数据框（避免覆盖）
-                        for col in df_with_indicators.columns:
-                            if col not in final_df.columns and col not in ['timestamp', 'ts_code', 'open', 'high', 'low', 'close', 'volume', 'amount']:
-                                final_df[col] = df_with_indicators[col]
+                        # 收集新增指标列（先出现的策略优先，避免覆盖）
+                        new_columns = [col for col in df_with_indicators.columns if col not in known_columns]
+                        if new_columns:
+                            indicator_frames.append(df_with_indicators[new_columns])
+                            known_columns.update(new_columns)
                         
                     except Exception as e:
                         print(f"策略 {strategy_name} 分析失败: {e}")
@@ -481,7 +554,8 @@ class ChartPlotter:
                         }
                 
                 # 使用包含所有指标的数据框
-                df = final_df
+                if indicator_frames:
+                    df = pd.concat([df] + indicator_frames, axis=1)
                 
                 # 创建图表
                 fig = self.create_kline_chart(
@@ -489,11 +563,11 @@ class ChartPlotter:
                     show_volume=True,
                     show_indicators=True
                 )
+                _put_cached_figure(cache_key, fig)
                 
                 # 保存图表
                 if save_path:
-                    fig.write_html(save_path)
-                    print(f"图表已保存到: {save_path}")
+                    save_chart_as_html(fig, save_path, include_plotlyjs)
                 
                 return fig
                 
@@ -510,7 +584,7 @@ class ChartPlotter:
         try:
             comparison_data = []
             
-            with StockAnalyzer() as analyzer:
+            with self.session() as analyzer:
                 for ts_code in stock_codes:
                     result = analyzer.analyze_single_stock(ts_code, strategy_name)
                     
@@ -568,6 +642,42 @@ class ChartPlotter:
             print(f"创建对比图表失败: {e}")
             return self._create_empty_chart(f"创建对比图表失败: {str(e)}", 1200, 600)
 
+def _get_cached_figure(key: tuple) -> Optional[go.Figure]:
+    """读取图表缓存，命中时返回副本，调用方修改返回的图表不影响缓存"""
+    with _FIGURE_CACHE_LOCK:
+        fig = _FIGURE_CACHE.get(key)
+        if fig is None:
+            return None
+        _FIGURE_CACHE.move_to_end(key)
+    return go.Figure(fig)
+
+def _put_cached_figure(key: tuple, fig: go.Figure):
+    """写入图表缓存（保存副本），超过容量时淘汰最久未使用的条目"""
+    fig = go.Figure(fig)
+    with _FIGURE_CACHE_LOCK:
+        _FIGURE_CACHE[key] = fig
+        while len(_FIGURE_CACHE) > _FIGURE_CACHE_SIZE:
+            _FIGURE_CACHE.popitem(last=False)
+
+def _minmax_positions(values: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    MinMax降采样：首尾点之间均分为 n_out//2 个桶，每桶保留最小值和最大值所在位置
+    尖峰和拐点得以保留；全为NaN的桶保留其首个位置，维持折线断开处
+    """
+    n = len(values)
+    n_bins = max(1, n_out // 2 - 1)
+    if n <= n_out or n - 2 < n_bins:
+        return np.arange(n)
+    
+    inner = values[1:-1]
+    bins = np.arange(n - 2) * n_bins // (n - 2)
+    starts = np.searchsorted(bins, np.arange(n_bins))
+    nan = np.isnan(inner)
+    # 按(桶, 值)排序，每个桶排序后的第一个位置即为该桶最小/最大值所在位置
+    mins = np.lexsort((np.where(nan, np.inf, inner), bins))[starts]
+    maxs = np.lexsort((np.where(nan, np.inf, -inner), bins))[starts]
+    return np.unique(np.concatenate(([0], mins + 1, maxs + 1, [n - 1])))
+
 def show_chart_in_browser(fig: go.Figure):
     """在浏览器中显示图表"""
     try:
@@ -575,12 +685,71 @@ def show_chart_in_browser(fig: go.Figure):
     except Exception as e:
         print(f"显示图表失败: {e}")
 
+_IMAGE_SERVER_LOCK = threading.Lock()
+_IMAGE_SERVER_STARTED = False
+
+def _ensure_image_server():
+    """
+    kaleido 1.x 默认每次导出都启动一次Chromium；支持常驻服务时只启动一次，后续导出复用同一浏览器
+    kaleido 0.2 由plotly内部复用同一子进程，无需处理
+    """
+    global _IMAGE_SERVER_STARTED
+    with _IMAGE_SERVER_LOCK:
+        if _IMAGE_SERVER_STARTED:
+            return
+        _IMAGE_SERVER_STARTED = True
+        try:
+            import kaleido
+        except ImportError:  # 未安装时由write_image给出提示
+            return
+        try:
+            if hasattr(kaleido, 'start_sync_server'):
+                kaleido.start_sync_server(silence_warnings=True)
+        except Exception as e:
+            print(f"启动图片导出服务失败，将逐次导出: {e}")
+
+def save_chart_as_html(fig: go.Figure, file_path: str, include_plotlyjs: Union[bool, str] = True):
+    """
+    保存图表为HTML
+    include_plotlyjs默认为True，内嵌plotly.js（约3MB），文件可离线打开；
+    传入'cdn'时从CDN加载（与Web界面一致），文件显著变小，但打开时需要联网；
+    路径以.gz结尾时写入gzip压缩文件，图表数组的压缩率通常在10倍以上
+    """
+    html = fig.to_html(include_plotlyjs=include_plotlyjs)
+    if file_path.endswith('.gz'):
+        with gzip.open(file_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            f.write(html)
+    else:
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(html)
+    print(f"图表已保存到: {file_path}")
+
 def save_chart_as_image(fig: go.Figure, file_path: str, 
                        format: str = 'png', width: int = 1200, height: int = 800):
     """保存图表为图片"""
     try:
+        _ensure_image_server()
         fig.write_image(file_path, format=format, width=width, height=height)
         print(f"图表已保存为图片: {file_path}")
     except Exception as e:
         print(f"保存图片失败: {e}")
+        print("提示: 需要安装 kaleido: pip install kaleido")
+
+def save_charts_as_images(figs: List[go.Figure], file_paths: List[str],
+                          format: str = 'png', width: int = 1200, height: int = 800):
+    """
+    批量保存图表为图片
+    plotly支持write_images时所有图表在同一浏览器会话中导出，否则逐个调用save_chart_as_image
+    """
+    if not hasattr(pio, 'write_images'):
+        for fig, file_path in zip(figs, file_paths):
+            save_chart_as_image(fig, file_path, format=format, width=width, height=height)
+        return
+    
+    try:
+        _ensure_image_server()
+        pio.write_images(list(figs), list(file_paths), format=format, width=width, height=height)
+        print(f"已批量保存 {len(file_paths)} 张图片")
+    except Exception as e:
+        print(f"批量保存图片失败: {e}")
         print("提示: 需要安装 kaleido: pip install kaleido")
\ No newline at end of file
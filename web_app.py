@@ -4,15 +4,22 @@
 提供批量分析结果的网页展示
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, stream_with_context
 import sys
 import os
 import json
+import time
+import uuid
+import threading
+from collections import Counter, OrderedDict, defaultdict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import plotly
 import plotly.graph_objects as go
 from plotly.utils import PlotlyJSONEncoder
+from pymysql.cursors import SSCursor
 
 # 添加项目路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -22,34 +29,188 @@ from engine import BatchAnalysisEngine, ProgressReporter
 from strategy import StrategyFactory
 from visualization import ChartPlotter
 
+try:
+    import orjson
+except ImportError:  # 未安装orjson时使用PlotlyJSONEncoder序列化图表
+    orjson = None
+
+try:
+    from redis import Redis
+    from rq import Queue
+    from rq.job import Job
+except ImportError:  # 未安装rq时批量分析在Web进程的后台线程中运行（仅限单进程部署）
+    Queue = None
+
+try:
+    from gevent import monkey as gevent_monkey
+except ImportError:
+    gevent_monkey = None
+
+try:
+    from flask_caching import Cache
+except ImportError:  # 未安装Flask-Caching时不缓存，每次直接查询数据库
+    Cache = None
+
 app = Flask(__name__, 
            template_folder='web/templates',
            static_folder='web/static')
 
+# 查询结果缓存：配置REDIS_URL时使用Redis（多进程共享），否则使用进程内缓存
+RECENT_BATCHES_TIMEOUT = 60     # 最近批次列表缓存秒数
+RECENT_BATCHES_GENERATION_KEY = 'recent_batches:generation'  # 最近批次列表代数，新批次写入时更新（不过期）
+BATCH_DETAILS_TIMEOUT = 300     # 批次详情缓存秒数（运行中的批次仍会追加结果，不宜过长）
+BATCH_DETAILS_FETCH_SIZE = 2000 # 批次详情结果每次从数据库读取的行数
+CHART_LOCK_TIMEOUT = 10         # 图表生成锁秒数，避免多个请求同时重复生成同一图表
+DATA_UPDATE_TIME = (15, 30)     # 交易日收盘后行情数据更新时间（时, 分），图表缓存至此失效
+ANALYSIS_JOB_TIMEOUT = '30m'    # 批量分析任务最长运行时间（rq）
+MAX_LOCAL_JOBS = 50             # 进程内保留的已结束批量分析任务记录数
+ANALYSIS_MAX_WORKERS = min(os.cpu_count() or 4, 16)  # 批量分析并发线程数，不超过数据库连接池容量
+
+if Cache is not None:
+    redis_url = os.environ.get('REDIS_URL')
+    cache = Cache(app, config={
+        'CACHE_TYPE': 'RedisCache' if redis_url else 'SimpleCache',
+        'CACHE_REDIS_URL': redis_url,
+        'CACHE_KEY_PREFIX': 'cn_stocks:',
+        'CACHE_DEFAULT_TIMEOUT': BATCH_DETAILS_TIMEOUT
+    })
+else:
+    cache = None
+
+def cache_get(key: str):
+    """读取缓存，缓存不可用（如Redis宕机）时返回None，调用方回退到数据库查询"""
+    if cache is None:
+        return None
+    try:
+        return cache.get(key)
+    except Exception as e:
+        print(f"读取缓存失败: {e}")
+        return None
+
+def cache_set(key: str, value, timeout: int):
+    """写入缓存，失败时忽略"""
+    if cache is None:
+        return
+    try:
+        cache.set(key, value, timeout=timeout)
+    except Exception as e:
+        print(f"写入缓存失败: {e}")
+
+def cache_add(key: str, value, timeout: int) -> bool:
+    """仅在键不存在时写入缓存（Redis下为原子操作），用作简单的分布式锁；缓存不可用时返回True"""
+    if cache is None:
+        return True
+    try:
+        return bool(cache.add(key, value, timeout=timeout))
+    except Exception as e:
+        print(f"写入缓存失败: {e}")
+        return True
+
+def cache_delete(key: str):
+    """删除缓存键，失败时忽略"""
+    if cache is None:
+        return
+    try:
+        cache.delete(key)
+    except Exception as e:
+        print(f"删除缓存失败: {e}")
+
+def _plotly_json_default(obj):
+    """orjson无法直接序列化的对象（如object类型数组）交由PlotlyJSONEncoder处理"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return PlotlyJSONEncoder().default(obj)
+
+def figure_to_json(fig: go.Figure) -> bytes:
+    """
+    将图表序列化为JSON字节串，结果与 json.dumps(fig, cls=PlotlyJSONEncoder) 等价：
+    数值和结构相同，时间戳的文本格式可能不同（如orjson输出"2024-01-01T00:00:00"，
+    PlotlyJSONEncoder输出"2024-01-01T00:00:00.000000"），plotly.js对两种格式的解析结果相同
+    """
+    if orjson is not None:
+        return orjson.dumps(fig.to_plotly_json(), default=_plotly_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(fig, cls=PlotlyJSONEncoder).encode('utf-8')
+
+def seconds_until_next_data_update(now: Optional[datetime] = None) -> int:
+    """距离下一个交易日行情数据更新时间的秒数（周末顺延至周一）"""
+    now = now or datetime.now()
+    hour, minute = DATA_UPDATE_TIME
+    next_update = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if next_update <= now:
+        next_update += timedelta(days=1)
+    while next_update.weekday() >= 5:
+        next_update += timedelta(days=1)
+    return max(int((next_update - now).total_seconds()), 60)
+
+def recent_batches_cache_key(limit: int) -> str:
+    """最近批次列表的缓存键，包含列表代数，代数变化后各limit的旧列表不再被读取"""
+    generation = cache_get(RECENT_BATCHES_GENERATION_KEY) or 0
+    return f"recent_batches:{generation}:{limit}"
+
+def invalidate_batch_cache(batch_id: Optional[int] = None):
+    """新批次写入后使最近批次列表和该批次详情的缓存失效，图表等其他缓存保留"""
+    cache_set(RECENT_BATCHES_GENERATION_KEY, time.time_ns(), 0)
+    if batch_id is not None:
+        cache_delete(f"batch_details:{batch_id}")
+
+def local_jobs_supported() -> bool:
+    """
+    进程内后台任务只适用于单个工作进程且使用真实线程的部署：
+    多进程时轮询请求会落到没有该任务记录的进程；gevent下线程被替换为协程，CPU密集的分析会阻塞整个工作进程
+    """
+    if int(os.environ.get('WEB_WORKERS', '1')) > 1:
+        return False
+    if gevent_monkey is not None and gevent_monkey.is_module_patched('threading'):
+        return False
+    return True
+
 class WebAnalysisService:
     """Web分析服务"""
     
     def __init__(self):
         self.batch_engine = None
+        self._engine_lock = threading.Lock()
         self.current_analysis = None
+        
+        # 批量分析任务队列：配置REDIS_URL且安装rq时交给独立的rq worker执行（rq worker analysis），
+        # 否则单进程部署在本进程的后台线程中依次执行，多进程或gevent部署在请求中同步执行
+        self.job_queue = None
+        if Queue is not None and os.environ.get('REDIS_URL'):
+            self.job_queue = Queue('analysis', connection=Redis.from_url(os.environ['REDIS_URL']))
+        self.local_jobs_enabled = self.job_queue is None and local_jobs_supported()
+        if self.job_queue is None and not self.local_jobs_enabled:
+            print("多进程/gevent部署未配置REDIS_URL或未安装rq，批量分析将在请求中同步执行")
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._jobs_lock = threading.Lock()
     
     def get_recent_batch_analyses(self, limit: int = 10) -> List[Dict]:
         """获取最近的批量分析结果"""
+        cache_key = recent_batches_cache_key(limit)
+        batch_list = cache_get(cache_key)
+        if batch_list is not None:
+            return batch_list
+        
         try:
             with AnalysisDatabase() as db:
-                # 获取最近的批次分析
+                # 获取最近的批次分析：先按 idx_created_at_id 取出最近N个批次，再只对这些批次的结果分组统计
                 query = """
                 SELECT ab.id, ab.batch_name, ab.created_at, ab.strategy_names,
                        COUNT(bar.analysis_id) as total_stocks,
                        SUM(CASE WHEN sar.signal = '买入' THEN 1 ELSE 0 END) as buy_signals,
                        SUM(CASE WHEN sar.signal = '卖出' THEN 1 ELSE 0 END) as sell_signals,
                        SUM(CASE WHEN sar.signal = '观望' THEN 1 ELSE 0 END) as hold_signals
-                FROM analysis_batches ab
+                FROM (
+                    SELECT id, batch_name, created_at, strategy_names
+                    FROM analysis_batches
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                ) ab
                 LEFT JOIN batch_analysis_results bar ON ab.id = bar.batch_id
                 LEFT JOIN stock_analysis_results sar ON bar.analysis_id = sar.id
                 GROUP BY ab.id, ab.batch_name, ab.created_at, ab.strategy_names
-                ORDER BY ab.created_at DESC
-                LIMIT %s
+                ORDER BY ab.created_at DESC, ab.id DESC
                 """
                 db.cursor.execute(query, (limit,))
                 results = db.cursor.fetchall()
@@ -67,6 +228,7 @@ class WebAnalysisService:
                         'hold_signals': row[7] or 0
                     })
                 
+                cache_set(cache_key, batch_list, RECENT_BATCHES_TIMEOUT)
                 return batch_list
                 
         except Exception as e:
@@ -75,6 +237,11 @@ class WebAnalysisService:
     
     def get_batch_details(self, batch_id: int) -> Dict:
         """获取批次详细结果"""
+        cache_key = f"batch_details:{batch_id}"
+        batch_details = cache_get(cache_key)
+        if batch_details is not None:
+            return batch_details
+        
         try:
             with AnalysisDatabase() as db:
                 # 获取批次基本信息
@@ -98,132 +265,259 @@ class WebAnalysisService:
                 WHERE bar.batch_id = %s
                 ORDER BY sar.confidence DESC, sar.ts_code
                 """
-                db.cursor.execute(results_query, (batch_id,))
-                results = db.cursor.fetchall()
+                # 使用非缓冲游标分块读取，避免大批次结果一次性全部载入内存
+                stock_results = defaultdict(dict)
+                stream_cursor = db.conn.cursor(SSCursor)
+                try:
+                    stream_cursor.execute(results_query, (batch_id,))
+                    while True:
+                        rows = stream_cursor.fetchmany(BATCH_DETAILS_FETCH_SIZE)
+                        if not rows:
+                            break
+                        for ts_code, strategy_name, signal, confidence, timestamp in rows:
+                            stock_results[ts_code][strategy_name] = {
+                                'signal': signal,
+                                'confidence': confidence,
+                                'timestamp': timestamp
+                            }
+                finally:
+                    stream_cursor.close()
+                stock_results = dict(stock_results)
                 
-                # 组织数据
-                stock_results = {}
-                strategy_summary = {}
+                # 预先计算每只股票的综合推荐与策略一致性，随批次详情一起缓存，页面渲染时直接读取
+                stock_consensus = {}
+                for ts_code, strategies in stock_results.items():
+                    consensus = get_consensus_for_stock(strategies)
+                    consensus['agreement'] = get_strategy_agreement(strategies)
+                    stock_consensus[ts_code] = consensus
                 
-                for row in results:
-                    ts_code, strategy_name, signal, confidence, timestamp = row
-                    
-                    if ts_code not in stock_results:
-                        stock_results[ts_code] = {}
-                    
-                    stock_results[ts_code][strategy_name] = {
-                        'signal': signal,
-                        'confidence': confidence,
-                        'timestamp': timestamp,
-                        'indicators': {}  # 暂时设为空，后续可扩展查询指标
-                    }
-                    
-                    # 策略汇总统计
+                # 策略汇总统计 - 由数据库按策略和信号分组计数并计算平均置信度
+                # 按各组最高置信度排序，策略顺序与明细结果中首次出现的顺序一致
+                summary_query = """
+                SELECT sar.strategy_name, sar.signal, COUNT(*), AVG(sar.confidence)
+                FROM batch_analysis_results bar
+                JOIN stock_analysis_results sar ON bar.analysis_id = sar.id
+                WHERE bar.batch_id = %s
+                GROUP BY sar.strategy_name, sar.signal
+                ORDER BY MAX(sar.confidence) DESC
+                """
+                db.cursor.execute(summary_query, (batch_id,))
+                
+                strategy_summary = {}
+                for strategy_name, signal, count, avg_confidence in db.cursor.fetchall():
                     if strategy_name not in strategy_summary:
                         strategy_summary[strategy_name] = {
                             'total': 0,
                             'signals': {'买入': 0, '卖出': 0, '观望': 0},
-                            'avg_confidence': {'买入': 0, '卖出': 0, '观望': 0},
-                            'confidence_sum': {'买入': 0, '卖出': 0, '观望': 0}
+                            'avg_confidence': {'买入': 0, '卖出': 0, '观望': 0}
                         }
                     
-                    strategy_summary[strategy_name]['total'] += 1
-                    strategy_summary[strategy_name]['signals'][signal] += 1
-                    strategy_summary[strategy_name]['confidence_sum'][signal] += confidence
+                    strategy_summary[strategy_name]['total'] += count
+                    strategy_summary[strategy_name]['signals'][signal] = count
+                    strategy_summary[strategy_name]['avg_confidence'][signal] = avg_confidence
                 
-                # 计算平均置信度
-                for strategy_data in strategy_summary.values():
-                    for signal in ['买入', '卖出', '观望']:
-                        if strategy_data['signals'][signal] > 0:
-                            strategy_data['avg_confidence'][signal] = \
-                                strategy_data['confidence_sum'][signal] / strategy_data['signals'][signal]
-                
-                return {
+                batch_details = {
                     'batch_id': batch_id,
                     'batch_name': batch_info[0] or f"批次-{batch_id}",
                     'created_at': batch_info[1],
                     'strategy_names': json.loads(batch_info[2]) if batch_info[2] else [],
                     'stock_results': stock_results,
+                    'stock_consensus': stock_consensus,
                     'strategy_summary': strategy_summary,
                     'total_stocks': len(stock_results)
                 }
                 
+                cache_set(cache_key, batch_details, BATCH_DETAILS_TIMEOUT)
+                return batch_details
+                
         except Exception as e:
             print(f"获取批次详情失败: {e}")
             return {}
     
+    def iter_batch_results(self, batch_id: int) -> Iterator[Dict]:
+        """
+        逐只股票读取批次结果，不在内存中保留整个批次
+        首个元素为批次基本信息，之后每个元素为一只股票的各策略结果（按股票代码排序）；批次不存在时不产生任何元素
+        """
+        with AnalysisDatabase() as db:
+            db.cursor.execute(
+                "SELECT batch_name, created_at, strategy_names FROM analysis_batches WHERE id = %s",
+                (batch_id,)
+            )
+            batch_info = db.cursor.fetchone()
+            if not batch_info:
+                return
+            
+            yield {
+                'batch_id': batch_id,
+                'batch_name': batch_info[0] or f"批次-{batch_id}",
+                'created_at': batch_info[1],
+                'strategy_names': json.loads(batch_info[2]) if batch_info[2] else []
+            }
+            
+            # 按股票代码排序，同一股票的结果相邻，读完一只股票即可输出
+            # 同一股票内按置信度降序，重复的策略结果以最后一条为准，与get_batch_details一致
+            results_query = """
+            SELECT sar.ts_code, sar.strategy_name, sar.signal, sar.confidence,
+                   sar.analysis_timestamp
+            FROM batch_analysis_results bar
+            JOIN stock_analysis_results sar ON bar.analysis_id = sar.id
+            WHERE bar.batch_id = %s
+            ORDER BY sar.ts_code, sar.confidence DESC
+            """
+            stream_cursor = db.conn.cursor(SSCursor)
+            try:
+                stream_cursor.execute(results_query, (batch_id,))
+                current_code = None
+                strategies = {}
+                while True:
+                    rows = stream_cursor.fetchmany(BATCH_DETAILS_FETCH_SIZE)
+                    if not rows:
+                        break
+                    for ts_code, strategy_name, signal, confidence, timestamp in rows:
+                        if ts_code != current_code:
+                            if current_code is not None:
+                                yield {'ts_code': current_code, 'strategies': strategies}
+                            current_code = ts_code
+                            strategies = {}
+                        strategies[strategy_name] = {
+                            'signal': signal,
+                            'confidence': confidence,
+                            'timestamp': timestamp
+                        }
+                if current_code is not None:
+                    yield {'ts_code': current_code, 'strategies': strategies}
+            finally:
+                stream_cursor.close()
+    
     def run_new_batch_analysis(self, limit: int = 50, strategies: Optional[List[str]] = None) -> Dict:
         """运行新的批量分析"""
         try:
             if strategies is None:
                 strategies = StrategyFactory.get_available_strategies()
             
-            # 初始化引擎
-            engine = BatchAnalysisEngine(max_workers=4)
-            
-            # 运行分析
-            result = engine.run_batch_analysis(
-                strategy_names=strategies,
-                limit=limit,
-                days=30,
-                batch_name=f"Web批量分析-{datetime.now().strftime('%Y%m%d-%H%M%S')}",
-                save_to_db=True,
-                progress_callback=None
-            )
+            # 复用常驻的分析引擎及其线程池；引擎记录单次分析的统计信息，同一时间只运行一个批次
+            with self._engine_lock:
+                if self.batch_engine is None:
+                    self.batch_engine = BatchAnalysisEngine(max_workers=ANALYSIS_MAX_WORKERS)
+                
+                # 运行分析
+                result = self.batch_engine.run_batch_analysis(
+                    strategy_names=strategies,
+                    limit=limit,
+                    days=30,
+                    batch_name=f"Web批量分析-{datetime.now().strftime('%Y%m%d-%H%M%S')}",
+                    save_to_db=True,
+                    progress_callback=None
+                )
             
+            # 新批次已写入，最近批次列表和该批次详情需重新查询
+            invalidate_batch_cache(result.get('summary', {}).get('batch_id'))
             return result
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    @property
+    def background_jobs_available(self) -> bool:
+        """批量分析能否作为后台任务提交（rq队列或单进程内的后台线程）"""
+        return self.job_queue is not None or self.local_jobs_enabled
+    
+    def submit_batch_analysis(self, limit: int = 50, strategies: Optional[List[str]] = None) -> str:
+        """提交后台批量分析任务，立即返回任务ID，需先确认 background_jobs_available"""
+        if self.job_queue is not None:
+            job = self.job_queue.enqueue(run_batch_analysis_job, limit, strategies,
+                                         job_timeout=ANALYSIS_JOB_TIMEOUT)
+            return job.id
+        
+        job_id = uuid.uuid4().hex
+        with self._jobs_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='batch-analysis')
+            self._jobs[job_id] = {'status': 'queued', 'result': None}
+            self._evict_finished_jobs()
+        self._executor.submit(self._run_local_job, job_id, limit, strategies)
+        return job_id
+    
+    def _run_local_job(self, job_id: str, limit: int, strategies: Optional[List[str]]):
+        """在后台线程中执行批量分析并记录结果"""
+        self._update_local_job(job_id, status='started')
+        try:
+            result = self.run_new_batch_analysis(limit, strategies)
+        except Exception as e:
+            self._update_local_job(job_id, status='failed', result={'success': False, 'error': str(e)})
+            return
+        self._update_local_job(job_id, status='finished', result=result)
+    
+    def _update_local_job(self, job_id: str, **fields):
+        """更新进程内任务记录"""
+        with self._jobs_lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+            self._evict_finished_jobs()
+    
+    def _evict_finished_jobs(self):
+        """记录数超过MAX_LOCAL_JOBS时按提交顺序删除已结束的任务，排队和运行中的任务始终保留（调用方持有锁）"""
+        excess = len(self._jobs) - MAX_LOCAL_JOBS
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in ('finished', 'failed')]
+        for job_id in finished[:excess]:
+            del self._jobs[job_id]
+    
+    def get_job_status(self, job_id: str) -> Optional[Dict]:
+        """
+        查询批量分析任务状态
+        Returns:
+            {'status': queued/started/finished/failed, 'result': 分析结果}，任务不存在时返回None
+        """
+        if self.job_queue is not None:
+            try:
+                job = Job.fetch(job_id, connection=self.job_queue.connection)
+            except Exception:
+                return None
+            return {'status': job.get_status(), 'result': job.result}
+        
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
 # 全局服务实例
 web_service = WebAnalysisService()
 
-# Jinja2 辅助函数
-@app.template_global()
+def run_batch_analysis_job(limit: int = 50, strategies: Optional[List[str]] = None) -> Dict:
+    """rq任务入口，在rq worker进程中执行批量分析"""
+    return web_service.run_new_batch_analysis(limit, strategies)
+
+# 综合推荐计算辅助函数
 def get_consensus_for_stock(strategies):
     """计算单只股票的综合推荐"""
     if not strategies:
         return {'signal': '观望', 'confidence': 0}
     
-    signals = [result['signal'] for result in strategies.values()]
-    confidences = [result['confidence'] for result in strategies.values()]
-    
-    # 统计各信号数量
-    signal_counts = {
-        '买入': signals.count('买入'),
-        '卖出': signals.count('卖出'),
-        '观望': signals.count('观望')
-    }
+    results = strategies.values()
     
-    # 确定综合推荐
-    consensus = max(signal_counts.items(), key=lambda x: x[1])[0]
+    # 单次遍历统计各信号数量，数量相同时按 买入、卖出、观望 的顺序取前者
+    signal_counts = Counter(result['signal'] for result in results)
+    consensus = max(('买入', '卖出', '观望'), key=lambda signal: signal_counts[signal])
     
     # 计算平均置信度
-    avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+    avg_confidence = sum(result['confidence'] for result in results) / len(results)
     
     return {
         'signal': consensus,
         'confidence': avg_confidence
     }
 
-@app.template_global()
 def get_strategy_agreement(strategies):
     """计算策略一致性百分比"""
     if not strategies:
         return 0
     
-    signals = [result['signal'] for result in strategies.values()]
-    if not signals:
-        return 0
-    
-    # 找到最多的信号类型
-    signal_counts = {}
-    for signal in signals:
-        signal_counts[signal] = signal_counts.get(signal, 0) + 1
-    
-    max_count = max(signal_counts.values())
-    agreement = (max_count / len(signals)) * 100
+    # 单次遍历统计各信号数量，取数量最多的信号
+    signal_counts = Counter(result['signal'] for result in strategies.values())
+    max_count = signal_counts.most_common(1)[0][1]
+    agreement = (max_count / len(strategies)) * 100
     
     return agreement
 
@@ -255,15 +549,40 @@ def api_run_analysis():
         limit = data.get('limit', 50)
         strategies = data.get('strategies', None)
         
-        result = web_service.run_new_batch_analysis(limit, strategies)
-        return jsonify(result)
+        # 无法提交后台任务时在请求中同步执行，直接返回分析结果
+        if not web_service.background_jobs_available:
+            result = web_service.run_new_batch_analysis(limit, strategies)
+            return jsonify({'success': True, 'status': 'finished', 'result': result})
+        
+        # 批量分析耗时较长，提交后台任务后立即返回，页面通过 /api/job/<job_id> 轮询进度
+        job_id = web_service.submit_batch_analysis(limit, strategies)
+        return jsonify({'success': True, 'job_id': job_id})
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/job/<string:job_id>')
+def api_job_status(job_id):
+    """API: 查询批量分析任务状态"""
+    job = web_service.get_job_status(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': '任务不存在'})
+    return jsonify({'success': True, 'job_id': job_id, **job})
+
 @app.route('/api/batch/<int:batch_id>')
 def api_batch_details(batch_id):
-    """API: 获取批次详情"""
+    """API: 获取批次详情，format=ndjson时逐行流式返回（首行为批次信息，之后每行一只股票）"""
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            try:
+                for item in web_service.iter_batch_results(batch_id):
+                    yield app.json.dumps(item) + '\n'
+            except Exception as e:
+                print(f"获取批次详情失败: {e}")
+                yield app.json.dumps({'error': str(e)}) + '\n'
+        
+        return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
     batch_data = web_service.get_batch_details(batch_id)
     return jsonify(batch_data)
 
@@ -292,17 +611,44 @@ def api_stock_chart(ts_code):
         if not strategies:
             strategies = StrategyFactory.get_available_strategies()
         
-        # 生成图表
-        plotter = ChartPlotter()
-        fig = plotter.create_stock_analysis_chart(
-            ts_code=ts_code,
-            strategy_names=strategies,
-            days=days
-        )
+        # 缓存序列化后的响应体，命中时直接返回，无需重新生成图表和编码JSON
+        cache_key = f"stock_chart:{ts_code}:{days}:{','.join(strategies)}"
+        body = cache_get(cache_key)
+        if body is not None:
+            return app.response_class(body, mimetype='application/json')
+        
+        lock_key = f"{cache_key}:lock"
+        acquired = cache_add(lock_key, 1, CHART_LOCK_TIMEOUT)
+        if not acquired:
+            # 其他请求正在生成同一图表，等待其结果
+            for _ in range(CHART_LOCK_TIMEOUT * 10):
+                time.sleep(0.1)
+                body = cache_get(cache_key)
+                if body is not None:
+                    return app.response_class(body, mimetype='application/json')
+            
+            # 等待超时后锁已过期（生成请求异常退出或耗时过长），重新获取锁后再生成，仍被占用时提示稍后重试
+            acquired = cache_add(lock_key, 1, CHART_LOCK_TIMEOUT)
+            if not acquired:
+                return jsonify({'success': False, 'error': '图表正在生成，请稍后重试'})
+        
+        try:
+            # 生成图表
+            plotter = ChartPlotter()
+            fig = plotter.create_stock_analysis_chart(
+                ts_code=ts_code,
+                strategy_names=strategies,
+                days=days
+            )
+            
+            # 转换为JSON，图表直接内嵌为对象，避免二次编码
+            body = b'{"success":true,"chart":' + figure_to_json(fig) + b'}'
+            cache_set(cache_key, body, seconds_until_next_data_update())
+        finally:
+            # 只释放本请求获取的锁
+            cache_delete(lock_key)
         
-        # 转换为JSON
-        chart_json = json.dumps(fig, cls=PlotlyJSONEncoder)
-        return jsonify({'success': True, 'chart': chart_json})
+        return app.response_class(body, mimetype='application/json')
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})